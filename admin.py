@@ -1,15 +1,86 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Blueprint, current_app, render_template, stream_template, request, redirect, url_for, session, flash, jsonify
 from functools import wraps
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import heapq
+import os
+import time
 import database as db
 
+try:
+    import jwt
+except Exception:
+    jwt = None
+
+# Project JWT secret (Supabase > Settings > API) used to verify access tokens locally
+SUPABASE_JWT_SECRET = os.environ.get("SUPABASE_JWT_SECRET")
+
 # Create a 'Blueprint' for the admin section. This helps organize routes.
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
+# How long a successful admin check stays valid before the profile is re-read
+ADMIN_CHECK_TTL = 300
+
+# Ids of all admin users, shared by every session in this worker and
+# refreshed from profiles at most every ADMIN_CHECK_TTL seconds. Admin is
+# granted/revoked in Supabase directly, so a change applies within that TTL.
+_admin_ids = frozenset()
+_admin_ids_fetched_at = None
+
+def _get_admin_ids(sb_admin):
+    """Return the set of admin user ids, reloading it when stale."""
+    global _admin_ids, _admin_ids_fetched_at
+    now = time.monotonic()
+    if _admin_ids_fetched_at is None or now - _admin_ids_fetched_at > ADMIN_CHECK_TTL:
+        rows = sb_admin.table('profiles').select('id').eq('is_admin', True).execute().data or []
+        _admin_ids = frozenset(r['id'] for r in rows if r.get('id'))
+        _admin_ids_fetched_at = now
+    return _admin_ids
+
+def _mark_session_admin(user_id):
+    """Remember in the user's session that they passed the admin check.
+    The grant is tied to user_id so it never carries over to another login."""
+    session['is_admin'] = True
+    session['admin_verified_at'] = time.time()
+    session['admin_user_id'] = user_id
+    if user_id:
+        session['user_id'] = user_id
+
+def _user_id_from_access_token(access_token):
+    """Verify a Supabase access token locally and return its user id.
+    Returns None when the token can't be verified locally (expired, signed
+    with another key or algorithm, wrong audience) or local verification is
+    not configured, in which case the caller should ask Supabase instead.
+    """
+    if jwt is None or not SUPABASE_JWT_SECRET:
+        return None
+    try:
+        claims = jwt.decode(access_token, SUPABASE_JWT_SECRET, algorithms=['HS256'], audience='authenticated')
+    except jwt.InvalidTokenError:
+        return None
+    return claims.get('sub')
+
 # --- Admin Authentication Decorator ---
 def admin_required(f):
     """A decorator to ensure a user is a logged-in admin."""
     @wraps(f)
     def decorated_function(*args, **kwargs):
+        # Shared service client (a process-wide singleton in database.py);
+        # every path below reuses it rather than looking it up again
+        sb_admin = db.get_supabase_client(service_role=True)
+
+        # Fast path: this session's current user was verified as admin recently
+        verified_at = session.get('admin_verified_at')
+        if (
+            session.get('is_admin')
+            and verified_at
+            and time.time() - verified_at < ADMIN_CHECK_TTL
+            and session.get('admin_user_id')
+            and session.get('admin_user_id') == session.get('user_id')
+        ):
+            if sb_admin:
+                return f(sb_admin, *args, **kwargs)
+
         # Prefer full Supabase session if present
         access_token = session.get('access_token')
         if access_token and session.get('refresh_token'):
@@ -18,15 +89,29 @@ def admin_required(f):
                 flash("Backend not configured. Please set SUPABASE_URL and SUPABASE_KEY.", "error")
                 return redirect(url_for('dashboard'))
             try:
-                sb.auth.set_session(access_token, session.get('refresh_token'))
-                user = sb.auth.get_user()
-                if not user:
-                    raise Exception("User not found")
-                profile = sb.table('profiles').select('is_admin').eq('id', user.user.id).single().execute().data
-                if not profile or not profile.get('is_admin'):
+                user_id = _user_id_from_access_token(access_token)
+                if user_id and sb_admin:
+                    # Token verified locally: no auth round trip, and admin routes
+                    # run on the service client as in the fallback below
+                    client = sb_admin
+                else:
+                    # Expired token (or no local secret): let Supabase validate/refresh it
+                    sb.auth.set_session(access_token, session.get('refresh_token'))
+                    user = sb.auth.get_user()
+                    if not user:
+                        raise Exception("User not found")
+                    user_id = user.user.id
+                    client = sb
+                if sb_admin:
+                    is_admin = user_id in _get_admin_ids(sb_admin)
+                else:
+                    rows = client.table('profiles').select('is_admin').eq('id', user_id).limit(1).execute().data
+                    is_admin = bool(rows and rows[0].get('is_admin'))
+                if not is_admin:
                     flash("You do not have permission to access this page.", "error")
                     return redirect(url_for('dashboard'))
-                return f(sb, *args, **kwargs)
+                _mark_session_admin(user_id)
+                return f(client, *args, **kwargs)
             except Exception as e:
                 flash(f"Admin access error: {e}", "error")
                 return redirect(url_for('dashboard'))
@@ -35,21 +120,21 @@ def admin_required(f):
         if not session.get('user_email'):
             return redirect(url_for('login'))
 
-        sb_admin = db.get_supabase_client(service_role=True)
         if not sb_admin:
             flash("Admin backend not configured. Please set SUPABASE_URL and SUPABASE_SERVICE_KEY in your environment.", "error")
             return redirect(url_for('dashboard'))
         try:
             user_id = session.get('user_id')
-            profile_query = sb_admin.table('profiles').select('id, is_admin')
-            if user_id:
-                profile_query = profile_query.eq('id', user_id)
-            else:
-                profile_query = profile_query.eq('email', session.get('user_email'))
-            profile = profile_query.single().execute().data
-            if not profile or not profile.get('is_admin'):
+            if not user_id:
+                # limit(1) instead of single(): a missing profile is a normal
+                # "not admin" answer, not a PostgREST 406 error
+                rows = sb_admin.table('profiles').select('id').eq('email', session.get('user_email')).limit(1).execute().data
+                user_id = rows[0].get('id') if rows else None
+            is_admin = bool(user_id) and user_id in _get_admin_ids(sb_admin)
+            if not is_admin:
                 flash("You do not have permission to access this page.", "error")
                 return redirect(url_for('dashboard'))
+            _mark_session_admin(user_id)
         except Exception as e:
             flash(f"Admin access error: {e}", "error")
             return redirect(url_for('dashboard'))
@@ -57,25 +142,168 @@ def admin_required(f):
         return f(sb_admin, *args, **kwargs)
     return decorated_function
 
+# Only the cron_run_logs columns the cron runs page actually uses
+CRON_LOG_COLUMNS = 'id, run_id, job, user_id, processed, notifications_sent, recipients, skipped_count'
+# Same, for databases without the skipped_count migration
+CRON_LOG_COLUMNS_LEGACY = 'id, run_id, job, user_id, processed, notifications_sent, recipients'
+# Whether cron_run_logs.skipped_count exists; None until the first read finds out
+_HAS_SKIPPED_COUNT = None
+
+def _select_cron_logs(sb, build):
+    """Execute build(select_query) on cron_run_logs, without the skipped_count
+    column if this process has found it doesn't exist."""
+    global _HAS_SKIPPED_COUNT
+    if _HAS_SKIPPED_COUNT is not False:
+        try:
+            res = build(sb.table('cron_run_logs').select(CRON_LOG_COLUMNS)).execute()
+            _HAS_SKIPPED_COUNT = True
+            return res
+        except Exception as e:
+            if 'skipped_count' not in str(e):
+                raise
+            _HAS_SKIPPED_COUNT = False
+    return build(sb.table('cron_run_logs').select(CRON_LOG_COLUMNS_LEGACY)).execute()
+
+# Per-user rows shown under each run on the cron runs page
+CRON_ITEMS_PER_RUN = 50
+
+def _make_run_bucket():
+    """Fresh per-run record used while aggregating cron_run_logs rows."""
+    return {'latest_row': None, 'items': []}
+
+def _items_for_display(items):
+    """Return the first CRON_ITEMS_PER_RUN rows of a run ordered by user_id."""
+    key = lambda x: str(x.get('user_id') or '')
+    if len(items) <= CRON_ITEMS_PER_RUN:
+        # Everything is shown: sort the run's own list in place, no heap or copy
+        items.sort(key=key)
+        return items
+    return heapq.nsmallest(CRON_ITEMS_PER_RUN, items, key=key)
+
 # --- Admin Panel Routes ---
 @admin_bp.route('/')
 @admin_required
 def dashboard(sb):
     """Main admin dashboard. Shows a list of all users."""
     all_users = db.admin_get_all_users()
-    return render_template('admin_dashboard.html', users=all_users, selected_user=None)
+    # Stream the page so the head and table chrome reach the browser while
+    # the user rows are still being rendered
+    return stream_template('admin_dashboard.html', users=all_users, selected_user=None)
 
-@admin_bp.route('/cron_runs')
-@admin_required
-def cron_runs(sb):
-    """Admin-only page: view last cron run summaries (counts per user)."""
+# Whether the cron_run_summaries view (supabase/migrations) is installed;
+# None until the first cron runs page view in this process finds out
+_HAS_RUN_SUMMARIES_VIEW = None
+
+def _runs_from_summary_view(sb):
+    """Build the 10 newest run summaries from the cron_run_summaries view.
+    Returns None if the view is not available so the caller can aggregate raw rows.
+    """
+    global _HAS_RUN_SUMMARIES_VIEW
+    if _HAS_RUN_SUMMARIES_VIEW is False:
+        return None
+    try:
+        summaries = sb.table('cron_run_summaries').select('*').order('latest_id', desc=True).limit(10).execute().data or []
+        _HAS_RUN_SUMMARIES_VIEW = True
+    except Exception as e:
+        if 'cron_run_summaries' in str(e):
+            _HAS_RUN_SUMMARIES_VIEW = False
+        return None
+    items_by_run = defaultdict(list)
+    run_ids = [s['run_id'] for s in summaries]
+    if run_ids:
+        # Per-user rows of all shown runs in one query, trimmed per run below;
+        # aggregate skipped-users rows are already counted in the view
+        rows = (
+            sb.table('cron_run_logs').select(CRON_LOG_COLUMNS)
+            .in_('run_id', run_ids).is_('skipped_count', 'null')
+            .order('run_id').order('user_id')
+            .execute().data or []
+        )
+        for r in rows:
+            items = items_by_run[r['run_id']]
+            if len(items) < CRON_ITEMS_PER_RUN:
+                items.append(r)
+    return [{
+        'run_id': s['run_id'],
+        'run_at': s.get('latest_id', 'N/A'),  # Use id as identifier
+        'job': s.get('job') or 'unknown',
+        'total_users': s.get('total_users') or 0,
+        'processed_users': s.get('processed_users') or 0,
+        'skipped_users': s.get('skipped_users') or 0,
+        'total_notifications': s.get('total_notifications') or 0,
+        'total_recipients': s.get('total_recipients') or 0,
+        'items': items_by_run.get(s['run_id'], []),
+    } for s in summaries]
+
+def _aggregate_cron_logs(rows):
+    """Reduce raw cron_run_logs rows to summaries of the 10 newest runs.
+    Kept free of Supabase/Flask so this CPU-bound step can be profiled or
+    swapped for a compiled implementation on its own.
+    """
+    runs = []
+    # Single pass over the log rows: per-run counters, distinct users and
+    # the newest row (highest id) for the run's job/identifier
+    agg = defaultdict(_make_run_bucket)
+    users_by_run = defaultdict(set)
+    processed, skipped, notifs, recips = Counter(), Counter(), Counter(), Counter()
+    skipped_only = Counter()  # users counted via aggregate skipped rows (no user_id)
+    for r in rows:
+        if not r or not r.get('run_id'):  # Ensure r is not None and has run_id
+            continue
+        rid = r['run_id']
+        bucket = agg[rid]
+        latest = bucket['latest_row']
+        if latest is None or (r.get('id') or 0) > (latest.get('id') or 0):
+            bucket['latest_row'] = r
+        n = r.get('skipped_count')
+        if n:
+            # Aggregate row for the run's skipped users: count it, don't list it
+            skipped[rid] += n
+            skipped_only[rid] += n
+            continue
+        bucket['items'].append(r)
+        uid = r.get('user_id')
+        if uid:
+            users_by_run[rid].add(uid)
+        if r.get('processed'):
+            processed[rid] += 1
+        else:
+            skipped[rid] += 1
+        n = r.get('notifications_sent')
+        if n:
+            notifs[rid] += n if type(n) is int else int(n)
+        n = r.get('recipients')
+        if n:
+            recips[rid] += n if type(n) is int else int(n)
+
+    # Only the 10 newest runs are shown, so build summaries for those alone
+    newest = sorted(agg.items(), key=lambda kv: kv[1]['latest_row'].get('id') or 0, reverse=True)[:10]
+    for run_id, bucket in newest:
+        latest = bucket['latest_row']
+        runs.append({
+            'run_id': run_id,
+            'run_at': latest.get('id', 'N/A'),  # Use id as identifier
+            'job': latest.get('job', 'unknown'),
+            'total_users': len(users_by_run[run_id]) + skipped_only[run_id],
+            'processed_users': processed[run_id],
+            'skipped_users': skipped[run_id],
+            'total_notifications': notifs[run_id],
+            'total_recipients': recips[run_id],
+            'items': _items_for_display(bucket['items']),
+        })
+    return runs
+
+def _runs_from_raw_logs(sb):
+    """Fetch recent cron_run_logs rows and aggregate the 10 newest runs in Python.
+    Returns (runs, error_msg).
+    """
     # Try a robust fetch that works even if ordering fails
     error_msg = None
     try:
         # Try to fetch cron run logs with proper error handling
         rows = []
         try:
-            result = sb.table('cron_run_logs').select('*').order('id', desc=True).limit(500).execute()
+            result = _select_cron_logs(sb, lambda q: q.order('id', desc=True).range(0, 499))
             if result and hasattr(result, 'data'):
                 potential_rows = result.data
                 # Debug what we actually got
@@ -95,7 +323,7 @@ def cron_runs(sb):
         except Exception as e1:
             # Fallback without ordering if that fails
             try:
-                result = sb.table('cron_run_logs').select('*').limit(500).execute()
+                result = _select_cron_logs(sb, lambda q: q.range(0, 499))
                 if result and hasattr(result, 'data') and result.data:
                     potential_rows = result.data
                     if isinstance(potential_rows, list):
@@ -116,50 +344,19 @@ def cron_runs(sb):
         rows = []
         error_msg = f"Outer query error: {e}"
 
+    runs = _aggregate_cron_logs(rows) if rows else []
+    return runs, error_msg
+
+@admin_bp.route('/cron_runs')
+@admin_required
+def cron_runs(sb):
+    """Admin-only page: view last cron run summaries (counts per user)."""
+    error_msg = None
     try:
-        from collections import defaultdict
-        grouped = defaultdict(list)
-        runs = []
-        
-        # Handle empty rows gracefully
-        if not rows:
-            runs = []
-        else:
-            for r in rows:
-                if r and r.get('run_id'):  # Ensure r is not None and has run_id
-                    grouped[r.get('run_id')].append(r)
-            
-            # Convert to regular dict to avoid any issues with defaultdict.items()
-            grouped_dict = dict(grouped)
-            for run_id, items in grouped_dict.items():
-                if not items:
-                    continue
-                # Get job info from first item (avoid complex sorting)
-                items_sorted = sorted(items, key=lambda x: str(x.get('user_id') or ''))
-                if items:
-                    job = items[0].get('job', 'unknown')
-                    run_at = items[0].get('id', 'N/A')  # Use id as identifier
-                else:
-                    job = 'unknown'
-                    run_at = None
-                    
-                total_users = len({i.get('user_id') for i in items if i.get('user_id')})
-                processed_users = sum(1 for i in items if i.get('processed'))
-                skipped_users = sum(1 for i in items if not i.get('processed'))
-                total_notifications = sum(int(i.get('notifications_sent') or 0) for i in items)
-                total_recipients = sum(int(i.get('recipients') or 0) for i in items)
-                runs.append({
-                    'run_id': run_id,
-                    'run_at': run_at,
-                    'job': job,
-                    'total_users': total_users,
-                    'processed_users': processed_users,
-                    'skipped_users': skipped_users,
-                    'total_notifications': total_notifications,
-                    'total_recipients': total_recipients,
-                    'items': items_sorted[:50],
-                })
-            runs = sorted(runs, key=lambda x: str(x.get('run_at') or ''), reverse=True)[:10]
+        # Prefer the pre-aggregated view; aggregate raw rows if it is not installed
+        runs = _runs_from_summary_view(sb)
+        if runs is None:
+            runs, error_msg = _runs_from_raw_logs(sb)
         if error_msg:
             flash(error_msg, 'warning')
         # Fetch current evening summary time from app_settings
@@ -269,46 +466,78 @@ def trigger_cron(sb):
 @admin_required
 def view_user(sb, user_id):
     """Shows the scrips and recipients for a specific user."""
-    all_users = db.admin_get_all_users()
-    selected_user_data = db.admin_get_user_details(user_id)
+    # The two reads are independent, so issue them concurrently
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        users_future = ex.submit(db.admin_get_all_users)
+        details_future = ex.submit(db.admin_get_user_details, user_id)
+        all_users = users_future.result()
+        selected_user_data = details_future.result()
     
-    return render_template('admin_dashboard.html', 
+    return stream_template('admin_dashboard.html', 
                            users=all_users, 
                            selected_user=selected_user_data)
 
+def _form(*keys):
+    """Return the stripped values of the given form fields ('' if missing)."""
+    form = request.form
+    return [form.get(k, '').strip() for k in keys]
+
+def _missing_fields_redirect(user_id):
+    flash("Missing required form fields.", "error")
+    if user_id:
+        return redirect(url_for('admin.view_user', user_id=user_id))
+    return redirect(url_for('admin.dashboard'))
+
+def _invalidate_user_data(*args):
+    """Drop the app's cached scrips/recipients after an admin edit (see app.invalidate_user_data)."""
+    invalidate = current_app.extensions.get('invalidate_user_data')
+    if invalidate:
+        invalidate(*args)
+
 @admin_bp.route('/add_scrip', methods=['POST'])
 @admin_required
 def add_scrip(sb):
-    user_id = request.form['user_id']
-    bse_code = request.form['scrip_code']
-    company_name = request.form['company_name']
+    user_id, bse_code, company_name = _form('user_id', 'scrip_code', 'company_name')
+    if not (user_id and bse_code and company_name):
+        return _missing_fields_redirect(user_id)
     db.admin_add_scrip_for_user(user_id, bse_code, company_name)
+    _invalidate_user_data('scrips', user_id)
     return redirect(url_for('admin.view_user', user_id=user_id))
 
 @admin_bp.route('/delete_scrip', methods=['POST'])
 @admin_required
 def delete_scrip(sb):
-    user_id = request.form['user_id']
-    bse_code = request.form['scrip_code']
+    user_id, bse_code = _form('user_id', 'scrip_code')
+    if not (user_id and bse_code):
+        return _missing_fields_redirect(user_id)
     db.admin_delete_scrip_for_user(user_id, bse_code)
+    _invalidate_user_data('scrips', user_id)
     return redirect(url_for('admin.view_user', user_id=user_id))
 
 @admin_bp.route('/add_recipient', methods=['POST'])
 @admin_required
 def add_recipient(sb):
-    user_id = request.form['user_id']
-    chat_id = request.form['chat_id']
+    user_id, chat_id = _form('user_id', 'chat_id')
+    if not (user_id and chat_id):
+        return _missing_fields_redirect(user_id)
     db.admin_add_recipient_for_user(user_id, chat_id)
+    _invalidate_user_data('recipients', user_id)
     return redirect(url_for('admin.view_user', user_id=user_id))
 
 @admin_bp.route('/delete_recipient', methods=['POST'])
 @admin_required
 def delete_recipient(sb):
-    user_id = request.form['user_id']
-    chat_id = request.form['chat_id']
+    user_id, chat_id = _form('user_id', 'chat_id')
+    if not (user_id and chat_id):
+        return _missing_fields_redirect(user_id)
     db.admin_delete_recipient_for_user(user_id, chat_id)
+    _invalidate_user_data('recipients', user_id)
     return redirect(url_for('admin.view_user', user_id=user_id))
 
+# Whether the admin_purge_except function (supabase/migrations) is installed;
+# None until the first purge in this process finds out
+_HAS_PURGE_RPC = None
+
 @admin_bp.route('/purge', methods=['POST'])
 @admin_required
 def purge_data(sb):
@@ -333,11 +562,25 @@ def purge_data(sb):
         flash('Could not determine current admin user id.', 'error')
         return redirect(url_for('admin.dashboard'))
 
+    global _HAS_PURGE_RPC
     try:
-        # Keep only current admin's rows in core tables
-        sb.table('seen_announcements').delete().neq('user_id', current_user_id).execute()
-        sb.table('monitored_scrips').delete().neq('user_id', current_user_id).execute()
-        sb.table('telegram_recipients').delete().neq('user_id', current_user_id).execute()
+        # Keep only current admin's rows in core tables (one atomic round trip)
+        purged = False
+        if _HAS_PURGE_RPC is not False:
+            try:
+                sb.rpc('admin_purge_except', {'keep': current_user_id}).execute()
+                _HAS_PURGE_RPC = purged = True
+            except Exception as e:
+                if 'admin_purge_except' not in str(e):
+                    raise
+                _HAS_PURGE_RPC = False
+        if not purged:
+            # Per-table deletes until the migration is applied
+            sb.table('seen_announcements').delete().neq('user_id', current_user_id).execute()
+            sb.table('monitored_scrips').delete().neq('user_id', current_user_id).execute()
+            sb.table('telegram_recipients').delete().neq('user_id', current_user_id).execute()
+        # Every other user's scrips and recipients are gone
+        _invalidate_user_data()
         flash('Purge complete. Kept only your data.', 'success')
     except Exception as e:
         flash(f'Purge failed: {e}', 'error')
@@ -1,25 +1,51 @@
 import os
+import re
+import sys
 from dotenv import load_dotenv
-from functools import wraps
+from functools import wraps, lru_cache
 load_dotenv()
 
-from flask import Flask, request, render_template, redirect, url_for, session, flash, jsonify
+from flask import Flask, request, render_template, redirect, url_for, session, flash, jsonify, g
+from flask_caching import Cache
 # from supabase import create_client  # not used directly
 import pandas as pd
+import numpy as np
 import database as db
 from firebase_admin import auth
 from admin import admin_bp
 import uuid
+import bisect
+from datetime import datetime
 from sentiment_analyzer import get_sentiment_analysis_for_stock, create_sentiment_visualizations
 from logging_config import github_logger
 import logging
 import traceback
 import atexit
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("FLASK_SECRET_KEY", "a-super-secret-key-for-local-testing")
 app.register_blueprint(admin_bp)
 
+# Response cache: shared Redis when REDIS_URL is set (so every Gunicorn
+# worker sees the same entries), otherwise a per-process in-memory cache
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    cache = Cache(app, config={'CACHE_TYPE': 'RedisCache', 'CACHE_REDIS_URL': REDIS_URL, 'CACHE_DEFAULT_TIMEOUT': 3600})
+else:
+    cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache', 'CACHE_DEFAULT_TIMEOUT': 3600})
+
+# Server-side sessions in the same Redis: the cookie only carries a session
+# id instead of the signed access/refresh tokens. Without Redis the default
+# signed-cookie sessions are kept.
+if REDIS_URL:
+    import redis
+    from flask_session import Session
+    app.config['SESSION_TYPE'] = 'redis'
+    app.config['SESSION_REDIS'] = redis.from_url(REDIS_URL)
+    Session(app)
+
 # Initialize logging
 github_logger.log_app_start()
 
@@ -63,14 +89,85 @@ atexit.register(cleanup_and_log)
 # Ensure Firebase Admin SDK is initialized when the app starts (works under Gunicorn too)
 db.initialize_firebase()
 
+# Build the shared service-role client now (database.py keeps one per process)
+# so the first cron/health request doesn't pay for its setup
+db.get_supabase_client(service_role=True)
+
 # --- Load local company data into memory for searching ---
+_TICKER_COLUMNS = ['Yahoo Symbol', 'Company Name', 'BSE Code']
+
+def _read_ticker_csv(path):
+    """Read only the columns we use, as strings with no NaN handling (empty
+    cells stay ''), with the Arrow parser when available."""
+    try:
+        return pd.read_csv(path, engine='pyarrow', usecols=_TICKER_COLUMNS, dtype=str,
+                           na_filter=False, dtype_backend='pyarrow')
+    except (ImportError, TypeError, ValueError):
+        # pyarrow not installed or pandas < 2.0: default C parser
+        return pd.read_csv(path, usecols=_TICKER_COLUMNS, dtype=str, na_filter=False)
+
 try:
-    company_df = pd.read_csv('indian_stock_tickers.csv')
-    company_df['BSE Code'] = company_df['BSE Code'].astype(str).fillna('')
+    company_df = _read_ticker_csv('indian_stock_tickers.csv')
 except FileNotFoundError:
     print("[CRITICAL ERROR] The company list 'indian_stock_tickers.csv' was not found. Search will not work.")
     company_df = pd.DataFrame(columns=['BSE Code', 'Company Name'])
 
+# Search arrays built once at startup so /search doesn't re-lowercase and
+# re-scan the DataFrame through pandas on every keystroke
+_search_names = company_df['Company Name'].to_numpy(dtype=str)
+_search_names_lower = np.char.lower(_search_names)
+_search_codes = company_df['BSE Code'].to_numpy(dtype=str)
+_search_symbols = (company_df['Yahoo Symbol'].to_numpy(dtype=str)
+                   if 'Yahoo Symbol' in company_df.columns else None)
+# BSE code -> company name for add_scrip (reversed so the first CSV row wins
+# when a code appears twice, as with the old DataFrame lookup)
+_bse_to_name = {sys.intern(code): sys.intern(name)
+                for code, name in zip(_search_codes[::-1].tolist(), _search_names[::-1].tolist())}
+# BSE codes sorted once (with their row positions) so prefix matches are a
+# bisect window instead of a scan over every code
+_codes_order = np.argsort(_search_codes, kind='stable')
+_codes_sorted = [sys.intern(code) for code in _search_codes[_codes_order].tolist()]
+
+# --- Per-user data cache ---
+# Scrips, recipients and category prefs are read on most page loads but only
+# change through the mutation routes below (and the admin routes), which drop
+# the user's entry. Only cached when the cache is the shared Redis: with the
+# per-process SimpleCache an invalidation would reach just the worker that
+# handled the write, leaving the other Gunicorn workers serving stale rows.
+_USER_DATA_LOADERS = {
+    'scrips': db.get_user_scrips,
+    'recipients': db.get_user_recipients,
+    'category_prefs': db.get_user_category_prefs,
+}
+
+@cache.memoize(300)
+def _cached_user_data(kind, user_id):
+    # The client is kept out of the memoize key: loads use the service client
+    return _USER_DATA_LOADERS[kind](db.get_supabase_client(service_role=True), user_id)
+
+def get_user_data(sb, kind, user_id, fresh=False):
+    """Return the user's scrips/recipients/category_prefs, cached for 5 minutes.
+    Reads go straight to the caller's client without Redis, when no service key
+    is configured, or with fresh=True (send routes, which must never message a
+    recipient that was just removed).
+    """
+    if fresh or not REDIS_URL or not db.get_supabase_client(service_role=True):
+        return _USER_DATA_LOADERS[kind](sb, user_id)
+    return _cached_user_data(kind, user_id)
+
+def invalidate_user_data(kind=None, user_id=None):
+    """Drop one cached entry, or every user's entries when called without arguments."""
+    if not REDIS_URL:
+        return
+    if kind is None:
+        cache.delete_memoized(_cached_user_data)
+    else:
+        cache.delete_memoized(_cached_user_data, kind, user_id)
+
+# The admin blueprint can't import app (app imports it), so it finds the
+# invalidation hook through the app's extensions
+app.extensions['invalidate_user_data'] = invalidate_user_data
+
 # --- Helper function to get an authenticated Supabase client ---
 def get_authenticated_client():
     """
@@ -78,12 +175,18 @@ def get_authenticated_client():
     Prioritizes a full Supabase session, but falls back to a service role client
     if the user is logged in via a Flask session (e.g., email-only).
     """
+    # Already resolved for this request (e.g. by login_required)
+    sb = g.get('sb_client')
+    if sb is not None:
+        return sb
+
     access_token = session.get('access_token')
     refresh_token = session.get('refresh_token')
     if access_token and refresh_token:
         sb = db.get_supabase_client()
         try:
             sb.auth.set_session(access_token, refresh_token)
+            g.sb_client = sb
             return sb
         except Exception as e:
             print(f"Session authentication error: {e}")
@@ -93,10 +196,17 @@ def get_authenticated_client():
 
     # Fallback for users logged in without a full Supabase session
     if session.get('user_email'):
-        return db.get_supabase_client(service_role=True)
+        sb = db.get_supabase_client(service_role=True)
+        if sb is not None:
+            g.sb_client = sb
+        return sb
 
     return None
 
+@app.teardown_request
+def _drop_request_client(exc):
+    g.pop('sb_client', None)
+
 # --- Decorator for Protected Routes ---
 def login_required(f):
     @wraps(f)
@@ -123,6 +233,10 @@ def _process_firebase_token():
         if user_result.get('error'):
             return jsonify({"success": False, "error": user_result['error']}), 401
 
+        # Start from a clean session so nothing from a previous login (admin
+        # grant, Supabase tokens) carries over to this identity
+        session.clear()
+
         # Set user data that is always present
         session['user_id'] = user_result.get('user_id')
         session['user_phone'] = user_result.get('phone')
@@ -152,6 +266,42 @@ def login():
     """Renders the new unified login page."""
     return render_template('login_unified.html')
 
+# cron_run_logs.user_id is a uuid column; anything else is logged as null
+_UUID_RE = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}', re.IGNORECASE)
+
+# Whether cron_run_logs.skipped_count exists; None until the first skipped-users write
+_HAS_SKIPPED_COUNT = None
+
+def _log_skipped_cron_users(sb, run_id, job_name, skipped_rows):
+    """Record a run's skipped users as a single aggregate cron_run_logs row.
+    Falls back to one row per skipped user when the skipped_count column
+    (supabase/migrations) is missing; checked once per process.
+    """
+    global _HAS_SKIPPED_COUNT
+    if _HAS_SKIPPED_COUNT is not False:
+        try:
+            sb.table('cron_run_logs').insert({
+                'run_id': run_id,
+                'job': job_name,
+                'user_id': None,
+                'processed': False,
+                'notifications_sent': 0,
+                'recipients': 0,
+                'skipped_count': len(skipped_rows),
+            }).execute()
+            _HAS_SKIPPED_COUNT = True
+            return
+        except Exception as e:
+            if 'skipped_count' not in str(e):
+                raise
+            _HAS_SKIPPED_COUNT = False
+    sb.table('cron_run_logs').insert(skipped_rows).execute()
+
+# Users handled concurrently by the cron endpoint (each send is network-bound).
+# Per-host request concurrency is capped separately by the pooled sessions in
+# database.py (TELEGRAM_/BSE_/YAHOO_MAX_IN_FLIGHT), so nested fan-outs can't multiply it.
+CRON_MAX_WORKERS = int(os.environ.get("CRON_MAX_WORKERS", "16"))
+
 @app.route('/cron/bse_announcements')
 @app.route('/cron/hourly_spike_alerts')
 @app.route('/cron/evening_summary')
@@ -181,87 +331,90 @@ def cron_bse_announcements():
         except Exception:
             hours_back = 1
 
-        # Fetch all scrips and recipients once
-        scrip_rows = sb.table('monitored_scrips').select('user_id, bse_code, company_name').execute().data or []
-        rec_rows = sb.table('telegram_recipients').select('user_id, chat_id').execute().data or []
-
-        # Build maps by user
-        scrips_by_user = {}
-        for r in scrip_rows:
-            uid = r.get('user_id')
-            if not uid:
-                continue
-            scrips_by_user.setdefault(uid, []).append({'bse_code': r.get('bse_code'), 'company_name': r.get('company_name')})
-
-        recs_by_user = {}
-        for r in rec_rows:
-            uid = r.get('user_id')
-            if not uid:
-                continue
-            recs_by_user.setdefault(uid, []).append({'chat_id': r.get('chat_id')})
+        # One (user_id, scrips, recipients) entry per user with monitored scrips
+        cron_users = db.get_active_cron_users(sb)
 
         totals = {"users_processed": 0, "notifications_sent": 0, "users_skipped": 0, "recipients": 0, "items": 0}
         errors = []
 
-        import uuid
+        # Decide which job to run based on path, once per run. Worker threads
+        # have no request context, so everything they need is read here.
+        path = request.path
+        is_spike = path.endswith('/hourly_spike_alerts')
+        is_evening = path.endswith('/evening_summary')
+        force = request.args.get('force') == 'true'
+
         run_id = str(uuid.uuid4())
-        job_name = 'hourly_spike_alerts' if request.path.endswith('/hourly_spike_alerts') else 'bse_announcements'
+        job_name = 'hourly_spike_alerts' if is_spike else 'bse_announcements'
+
+        def _send_for_user(uid, scrips, recipients):
+            if is_spike:
+                return db.send_hourly_spike_alerts(sb, uid, scrips, recipients)
+            elif is_evening:
+                # Enforce evening run by default; allow override with force=true
+                is_open, open_dt, close_dt = db.ist_market_window()
+                now = db.ist_now()
+                if (now <= close_dt) and not force:
+                    # Skip if before or during market hours unless forced
+                    return 0
+                # Send price summary instead of announcements
+                return db.send_script_messages_to_telegram(sb, uid, scrips, recipients)
+            return db.send_bse_announcements_consolidated(sb, uid, scrips, recipients, hours_back=hours_back)
 
-        for uid, scrips in scrips_by_user.items():
-            recipients = recs_by_user.get(uid) or []
+        log_rows = []  # cron_run_logs rows, written in one insert after the loop
+        skipped_rows = []  # only written individually if the aggregate row can't be
+        active = []
+        for uid, scrips, recipients in cron_users:
             if not scrips or not recipients:
                 totals["users_skipped"] += 1
-                try:
-                    # Ensure user_id is a valid UUID
-                    user_uuid = uid if uid and len(uid) == 36 and '-' in uid else None
-                    sb.table('cron_run_logs').insert({
-                        'run_id': run_id,
-                        'job': job_name,
-                        'user_id': user_uuid,
-                        'processed': False,
-                        'notifications_sent': 0,
-                        'recipients': int(len(recipients)),
-                    }).execute()
-                except Exception as e:
-                    logging.error(f"Failed to log skipped cron run: {e}")
+                # Ensure user_id is a valid UUID
+                user_uuid = uid if uid and _UUID_RE.fullmatch(uid) else None
+                skipped_rows.append({
+                    'run_id': run_id,
+                    'job': job_name,
+                    'user_id': user_uuid,
+                    'processed': False,
+                    'notifications_sent': 0,
+                    'recipients': int(len(recipients)),
+                })
                 continue
-            try:
-                # Decide which job to run based on path
-                if request.path.endswith('/hourly_spike_alerts'):
-                    sent = db.send_hourly_spike_alerts(sb, uid, scrips, recipients)
-                elif request.path.endswith('/evening_summary'):
-                    # Enforce evening run by default; allow override with force=true
-                    force = request.args.get('force') == 'true'
-                    is_open, open_dt, close_dt = db.ist_market_window()
-                    from datetime import datetime
-                    now = db.ist_now()
-                    if (now <= close_dt) and not force:
-                        # Skip if before or during market hours unless forced
-                        sent = 0
-                    else:
-                        # Send price summary instead of announcements
-                        sent = db.send_script_messages_to_telegram(sb, uid, scrips, recipients)
-                else:
-                    sent = db.send_bse_announcements_consolidated(sb, uid, scrips, recipients, hours_back=hours_back)
-                totals["users_processed"] += 1
-                totals["notifications_sent"] += sent
-                totals["recipients"] += len(recipients)
-                try:
+            active.append((uid, scrips, recipients))
+
+        # Users are independent and each send is network-bound, so fan out
+        if active:
+            with ThreadPoolExecutor(max_workers=min(CRON_MAX_WORKERS, len(active))) as ex:
+                futures = [(uid, recipients, ex.submit(_send_for_user, uid, scrips, recipients))
+                           for uid, scrips, recipients in active]
+                for uid, recipients, future in futures:
+                    try:
+                        sent = future.result()
+                    except Exception as e:
+                        errors.append({"user_id": uid, "error": str(e)})
+                        continue
+                    totals["users_processed"] += 1
+                    totals["notifications_sent"] += sent
+                    totals["recipients"] += len(recipients)
                     # Ensure user_id is a valid UUID
-                    user_uuid = uid if uid and len(uid) == 36 and '-' in uid else None
-                    sb.table('cron_run_logs').insert({
+                    user_uuid = uid if uid and _UUID_RE.fullmatch(uid) else None
+                    log_rows.append({
                         'run_id': run_id,
                         'job': job_name,
                         'user_id': user_uuid,
                         'processed': True,
                         'notifications_sent': int(sent),
                         'recipients': int(len(recipients)),
-                    }).execute()
-                except Exception as e:
-                    logging.error(f"Failed to log cron run: {e}")
-                # We do not know exact items here, but we can log via BSE_VERBOSE in the function
+                    })
+
+        if log_rows:
+            try:
+                sb.table('cron_run_logs').insert(log_rows).execute()
             except Exception as e:
-                errors.append({"user_id": uid, "error": str(e)})
+                logging.error(f"Failed to log cron run: {e}")
+        if skipped_rows:
+            try:
+                _log_skipped_cron_users(sb, run_id, job_name, skipped_rows)
+            except Exception as e:
+                logging.error(f"Failed to log skipped cron run: {e}")
 
         return jsonify({"ok": True, **totals, "errors": errors})
     except Exception as e:
@@ -284,24 +437,37 @@ def logout():
     return redirect(url_for('login'))
 
 # --- Main Application Routes (Protected) ---
-@app.route('/health')
-def health_check():
-    """Lightweight health check endpoint for uptime monitoring.
-    Returns 200 OK with minimal processing to keep the app alive.
-    """
-    from datetime import datetime
+# Uptime monitors poll /health often, so the DB check result is reused briefly
+HEALTH_DB_CHECK_TTL = 30
+_health_db_status = None  # (checked_at, status)
+
+def _db_health_status():
+    global _health_db_status
+    now = time.monotonic()
+    if _health_db_status and now - _health_db_status[0] < HEALTH_DB_CHECK_TTL:
+        return _health_db_status[1]
     try:
         # Quick DB connectivity check
         sb = db.get_supabase_client(service_role=True)
         if sb:
             # Very lightweight query
-            sb.table('profiles').select('id', count='exact').limit(1).execute()
+            sb.table('profiles').select('id').limit(1).execute()
             db_status = 'connected'
         else:
             db_status = 'disconnected'
     except Exception as e:
         db_status = f'error: {str(e)[:50]}'
-    
+    _health_db_status = (now, db_status)
+    return db_status
+
+@app.route('/health')
+def health_check():
+    """Lightweight health check endpoint for uptime monitoring.
+    Returns 200 OK with minimal processing to keep the app alive.
+    The database status is refreshed at most every HEALTH_DB_CHECK_TTL seconds.
+    """
+    db_status = _db_health_status()
+
     return {
         'status': 'ok',
         'timestamp': datetime.utcnow().isoformat() + 'Z',
@@ -379,38 +545,20 @@ def test_evening_summary():
             return {'error': 'Supabase not configured'}, 500
         
         # Force run evening summary for all users
-        from datetime import datetime
-        import uuid
         
         run_id = str(uuid.uuid4())
         job_name = 'evening_summary_test'
         
-        # Get all users with scrips and recipients
-        scrip_rows = sb.table('monitored_scrips').select('user_id, bse_code, company_name').execute().data or []
-        rec_rows = sb.table('telegram_recipients').select('user_id, chat_id').execute().data or []
-        
-        # Build maps by user
-        scrips_by_user = {}
-        for r in scrip_rows:
-            uid = r.get('user_id')
-            if not uid:
-                continue
-            scrips_by_user.setdefault(uid, []).append({'bse_code': r.get('bse_code'), 'company_name': r.get('company_name')})
-
-        recs_by_user = {}
-        for r in rec_rows:
-            uid = r.get('user_id')
-            if not uid:
-                continue
-            recs_by_user.setdefault(uid, []).append({'chat_id': r.get('chat_id')})
+        # One (user_id, scrips, recipients) entry per user with monitored scrips
+        cron_users = db.get_active_cron_users(sb)
 
         users_processed = 0
         notifications_sent = 0
         users_skipped = 0
         errors = []
 
-        for uid, scrips in scrips_by_user.items():
-            recipients = recs_by_user.get(uid) or []
+        log_rows = []  # cron_run_logs rows, written in one insert after the loop
+        for uid, scrips, recipients in cron_users:
             if not scrips or not recipients:
                 users_skipped += 1
                 continue
@@ -421,23 +569,26 @@ def test_evening_summary():
                 notifications_sent += sent
                 
                 # Log the run
-                try:
-                    user_uuid = uid if uid and len(uid) == 36 and '-' in uid else None
-                    sb.table('cron_run_logs').insert({
-                        'run_id': run_id,
-                        'job': job_name,
-                        'user_id': user_uuid,
-                        'processed': True,
-                        'notifications_sent': int(sent),
-                        'recipients': int(len(recipients)),
-                    }).execute()
-                except Exception as e:
-                    errors.append(f"Failed to log for user {uid}: {e}")
+                user_uuid = uid if uid and _UUID_RE.fullmatch(uid) else None
+                log_rows.append({
+                    'run_id': run_id,
+                    'job': job_name,
+                    'user_id': user_uuid,
+                    'processed': True,
+                    'notifications_sent': int(sent),
+                    'recipients': int(len(recipients)),
+                })
                     
             except Exception as e:
                 errors.append({"user_id": uid, "error": str(e)})
                 users_skipped += 1
 
+        if log_rows:
+            try:
+                sb.table('cron_run_logs').insert(log_rows).execute()
+            except Exception as e:
+                errors.append(f"Failed to write cron run logs: {e}")
+
         return {
             'success': True,
             'run_id': run_id,
@@ -461,7 +612,6 @@ def monitor_cron_status():
         if not sb:
             return {'error': 'Supabase not configured'}, 500
         
-        from datetime import datetime, timedelta
         
         # Get recent cron runs (last 24 hours)
         result = sb.table('cron_run_logs').select('*').order('id', desc=True).limit(100).execute()
@@ -546,40 +696,22 @@ def force_evening_summary():
         if not sb:
             return {'error': 'Supabase not configured'}, 500
         
-        from datetime import datetime
-        import uuid
         
         run_id = str(uuid.uuid4())
         job_name = 'evening_summary_forced'
         
-        # Get all users with scrips and recipients
-        scrip_rows = sb.table('monitored_scrips').select('user_id, bse_code, company_name').execute().data or []
-        rec_rows = sb.table('telegram_recipients').select('user_id, chat_id').execute().data or []
-        
-        # Build maps by user
-        scrips_by_user = {}
-        for r in scrip_rows:
-            uid = r.get('user_id')
-            if not uid:
-                continue
-            scrips_by_user.setdefault(uid, []).append({'bse_code': r.get('bse_code'), 'company_name': r.get('company_name')})
-
-        recs_by_user = {}
-        for r in rec_rows:
-            uid = r.get('user_id')
-            if not uid:
-                continue
-            recs_by_user.setdefault(uid, []).append({'chat_id': r.get('chat_id')})
+        # One (user_id, scrips, recipients) entry per user with monitored scrips
+        cron_users = db.get_active_cron_users(sb)
 
         users_processed = 0
         notifications_sent = 0
         users_skipped = 0
         errors = []
 
-        print(f"FORCE EVENING SUMMARY: Processing {len(scrips_by_user)} users...")
+        print(f"FORCE EVENING SUMMARY: Processing {len(cron_users)} users...")
 
-        for uid, scrips in scrips_by_user.items():
-            recipients = recs_by_user.get(uid) or []
+        log_rows = []  # cron_run_logs rows, written in one insert after the loop
+        for uid, scrips, recipients in cron_users:
             if not scrips or not recipients:
                 users_skipped += 1
                 continue
@@ -591,24 +723,27 @@ def force_evening_summary():
                 print(f"  User {uid}: sent {sent} notifications")
                 
                 # Log the run
-                try:
-                    user_uuid = uid if uid and len(uid) == 36 and '-' in uid else None
-                    sb.table('cron_run_logs').insert({
-                        'run_id': run_id,
-                        'job': job_name,
-                        'user_id': user_uuid,
-                        'processed': True,
-                        'notifications_sent': int(sent),
-                        'recipients': int(len(recipients)),
-                    }).execute()
-                except Exception as e:
-                    errors.append(f"Failed to log for user {uid}: {e}")
+                user_uuid = uid if uid and _UUID_RE.fullmatch(uid) else None
+                log_rows.append({
+                    'run_id': run_id,
+                    'job': job_name,
+                    'user_id': user_uuid,
+                    'processed': True,
+                    'notifications_sent': int(sent),
+                    'recipients': int(len(recipients)),
+                })
                     
             except Exception as e:
                 errors.append({"user_id": uid, "error": str(e)})
                 users_skipped += 1
                 print(f"  ERROR User {uid}: {e}")
 
+        if log_rows:
+            try:
+                sb.table('cron_run_logs').insert(log_rows).execute()
+            except Exception as e:
+                errors.append(f"Failed to write cron run logs: {e}")
+
         result = {
             'success': True,
             'forced': True,
@@ -635,7 +770,6 @@ def get_memory_usage():
     """Get current memory usage in MB"""
     try:
         import psutil
-        import os
         process = psutil.Process(os.getpid())
         return round(process.memory_info().rss / 1024 / 1024, 2)
     except Exception:
@@ -646,10 +780,10 @@ def get_memory_usage():
 def dashboard(sb):
     """Main dashboard showing monitored scrips and recipients."""
     user_id = session.get('user_id')
-    monitored_scrips = db.get_user_scrips(sb, user_id)
-    telegram_recipients = db.get_user_recipients(sb, user_id)
+    monitored_scrips = get_user_data(sb, 'scrips', user_id)
+    telegram_recipients = get_user_data(sb, 'recipients', user_id)
     
-    category_prefs = db.get_user_category_prefs(sb, user_id)
+    category_prefs = get_user_data(sb, 'category_prefs', user_id)
     return render_template('dashboard.html', 
                            monitored_scrips=monitored_scrips,
                            telegram_recipients=telegram_recipients,
@@ -657,6 +791,17 @@ def dashboard(sb):
                            user_email=session.get('user_email', ''),
                            user_phone=session.get('user_phone', ''))
 
+@lru_cache(maxsize=2048)
+def _search_indices(q):
+    """Row indices (at most 10) whose name contains q or whose BSE code starts with it.
+    q is the lowercased query, so 'ABB' and 'abb' share a cache entry.
+    """
+    mask = np.char.find(_search_names_lower, q) >= 0
+    lo = bisect.bisect_left(_codes_sorted, q)
+    hi = bisect.bisect_left(_codes_sorted, q + '\uffff', lo)
+    mask[_codes_order[lo:hi]] = True
+    return tuple(np.flatnonzero(mask)[:10].tolist())
+
 @app.route('/search')
 @login_required
 def search(sb):
@@ -665,11 +810,13 @@ def search(sb):
     if not query or len(query) < 2:
         return jsonify({"matches": []})
     
-    mask = (company_df['Company Name'].str.contains(query, case=False, na=False)) | \
-           (company_df['BSE Code'].str.startswith(query))
-           
-    matches = company_df[mask].head(10)
-    return jsonify({"matches": matches.to_dict('records')})
+    matches = []
+    for i in _search_indices(query.lower()):
+        match = {'BSE Code': str(_search_codes[i]), 'Company Name': str(_search_names[i])}
+        if _search_symbols is not None:
+            match['Yahoo Symbol'] = str(_search_symbols[i])
+        matches.append(match)
+    return jsonify({"matches": matches})
 
 @app.route('/send_script_messages', methods=['POST'])
 @login_required
@@ -677,8 +824,8 @@ def send_script_messages(sb):
     """Triggers sending Telegram messages for all monitored scrips."""
     user_id = session.get('user_id')
     try:
-        monitored_scrips = db.get_user_scrips(sb, user_id)
-        telegram_recipients = db.get_user_recipients(sb, user_id)
+        monitored_scrips = get_user_data(sb, 'scrips', user_id, fresh=True)
+        telegram_recipients = get_user_data(sb, 'recipients', user_id, fresh=True)
         
         if not monitored_scrips:
             flash('No scrips to monitor. Please add scrips first.', 'info')
@@ -703,8 +850,8 @@ def send_bse_announcements(sb):
     """Send consolidated BSE announcements for monitored scrips to Telegram recipients."""
     user_id = session.get('user_id')
     try:
-        monitored_scrips = db.get_user_scrips(sb, user_id)
-        telegram_recipients = db.get_user_recipients(sb, user_id)
+        monitored_scrips = get_user_data(sb, 'scrips', user_id, fresh=True)
+        telegram_recipients = get_user_data(sb, 'recipients', user_id, fresh=True)
         hours_back = 24
         try:
             hours_back = int(request.form.get('hours_back', 24))
@@ -740,14 +887,13 @@ def add_scrip(sb):
         return redirect(url_for('dashboard'))
 
     if not company_name:
-        match = company_df[company_df['BSE Code'] == bse_code]
-        if not match.empty:
-            company_name = str(match.iloc[0]['Company Name'])
-        else:
+        company_name = _bse_to_name.get(bse_code)
+        if not company_name:
             flash('Scrip code not found. Please check the BSE code.', 'error')
             return redirect(url_for('dashboard'))
 
     db.add_user_scrip(sb, user_id, bse_code, company_name)
+    invalidate_user_data('scrips', user_id)
     flash(f'Added {company_name} to your watchlist.', 'success')
     return redirect(url_for('dashboard'))
 
@@ -757,6 +903,7 @@ def delete_scrip(sb):
     user_id = session.get('user_id')
     bse_code = request.form['scrip_code']
     db.delete_user_scrip(sb, user_id, bse_code)
+    invalidate_user_data('scrips', user_id)
     flash(f'Scrip {bse_code} removed from your watchlist.', 'success')
     return redirect(url_for('dashboard'))
 
@@ -766,6 +913,7 @@ def add_recipient(sb):
     user_id = session.get('user_id')
     chat_id = request.form['chat_id']
     db.add_user_recipient(sb, user_id, chat_id)
+    invalidate_user_data('recipients', user_id)
     flash(f'Added recipient {chat_id}.', 'success')
     return redirect(url_for('dashboard'))
 
@@ -775,6 +923,7 @@ def delete_recipient(sb):
     user_id = session.get('user_id')
     chat_id = request.form['chat_id']
     db.delete_user_recipient(sb, user_id, chat_id)
+    invalidate_user_data('recipients', user_id)
     flash(f'Recipient {chat_id} removed.', 'success')
     return redirect(url_for('dashboard'))
 
@@ -784,6 +933,7 @@ def set_category_prefs(sb):
     user_id = session.get('user_id')
     selected = request.form.getlist('categories')
     ok = db.set_user_category_prefs(sb, user_id, selected)
+    invalidate_user_data('category_prefs', user_id)
     if ok:
         flash('Category preferences saved.', 'success')
     else:
@@ -796,7 +946,7 @@ def set_category_prefs(sb):
 def sentiment_analysis(sb):
     """Renders the sentiment analysis dashboard."""
     user_id = session.get('user_id')
-    monitored_scrips = db.get_user_scrips(sb, user_id)
+    monitored_scrips = get_user_data(sb, 'scrips', user_id)
     return render_template('sentiment_analysis.html', 
                          scrips=monitored_scrips,
                          user_email=session.get('user_email'))
@@ -826,19 +976,34 @@ def analyze_sentiment(sb):
         print(f"Error in analyze_sentiment: {e}")
         return jsonify({'error': str(e)}), 500
 
+@cache.memoize(600)
+def _cached_sentiment_summary(bse_code, company_name, hours_back):
+    return get_sentiment_analysis_for_stock(bse_code, company_name, hours_back=hours_back)
+
+def _sentiment_summary_task(bse_code, company_name, hours_back):
+    # Runs on a worker thread, which needs its own app context for the cache
+    with app.app_context():
+        return _cached_sentiment_summary(bse_code, company_name, hours_back)
+
 @app.route('/get_sentiment_summary')
 @login_required
 def get_sentiment_summary(sb):
     """API endpoint for a quick sentiment summary of monitored scrips."""
     try:
         user_id = session.get('user_id')
-        monitored_scrips = db.get_user_scrips(sb, user_id)
+        monitored_scrips = get_user_data(sb, 'scrips', user_id)
         
+        scrips = monitored_scrips[:5]  # Limit to 5 for performance
         summary_data = []
-        for scrip in monitored_scrips[:5]:  # Limit to 5 for performance
+        if not scrips:
+            return jsonify({'success': True, 'summary_data': summary_data})
+        # Each analysis is network-bound, so run them side by side
+        with ThreadPoolExecutor(max_workers=len(scrips)) as ex:
+            futures = [ex.submit(_sentiment_summary_task, scrip['bse_code'], scrip['company_name'], 6)
+                       for scrip in scrips]
+        for scrip, future in zip(scrips, futures):
             try:
-                result = get_sentiment_analysis_for_stock(
-                    scrip['bse_code'], scrip['company_name'], hours_back=6)
+                result = future.result()
                 summary_data.append({
                     'bse_code': scrip['bse_code'],
                     'company_name': scrip['company_name'],
@@ -856,11 +1021,6 @@ def get_sentiment_summary(sb):
         print(f"Error in get_sentiment_summary: {e}")
         return jsonify({'error': str(e)}), 500
 
-# --- Health Check ---
-@app.route('/health')
-def health():
-    return 'ok', 200
-
 # --- Main Execution ---
 if __name__ == '__main__':
     db.initialize_firebase()
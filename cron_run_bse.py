@@ -31,33 +31,17 @@ def run(hours_back: int = 1) -> int:
         except Exception:
             hours_back = 1
 
-        scrip_rows = sb.table('monitored_scrips').select('user_id, bse_code, company_name').execute().data or []
-        rec_rows = sb.table('telegram_recipients').select('user_id, chat_id').execute().data or []
-
-        # Build maps by user
-        scrips_by_user = {}
-        for r in scrip_rows:
-            uid = r.get('user_id')
-            if not uid:
-                continue
-            scrips_by_user.setdefault(uid, []).append({'bse_code': r.get('bse_code'), 'company_name': r.get('company_name')})
-
-        recs_by_user = {}
-        for r in rec_rows:
-            uid = r.get('user_id')
-            if not uid:
-                continue
-            recs_by_user.setdefault(uid, []).append({'chat_id': r.get('chat_id')})
+        # One (user_id, scrips, recipients) entry per user with monitored scrips
+        cron_users = db.get_active_cron_users(sb)
 
         users_processed = 0
         notifications_sent = 0
         users_skipped = 0
         errors = []
 
-        print(f"Starting BSE announcements run (hours_back={hours_back}) for {len(scrips_by_user)} users with scrips...")
+        print(f"Starting BSE announcements run (hours_back={hours_back}) for {len(cron_users)} users with scrips...")
 
-        for uid, scrips in scrips_by_user.items():
-            recipients = recs_by_user.get(uid) or []
+        for uid, scrips, recipients in cron_users:
             if not scrips or not recipients:
                 users_skipped += 1
                 continue
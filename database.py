@@ -1,8 +1,17 @@
+import heapq
+import io
+import logging
 import os
+import random
+import sys
+import threading
 
 # Patch httpx to support 'proxy' kwarg by remapping to 'proxies' for older httpx versions
 try:
     import httpx as _httpx
+    # Pool bounds for the long-lived Supabase clients so keep-alive connections
+    # are reused across requests instead of growing per worker thread
+    _HTTP_POOL_LIMITS = _httpx.Limits(max_connections=20, max_keepalive_connections=10)
     _OrigClient = _httpx.Client
     class _PatchedClient(_OrigClient):
         def __init__(self, *args, **kwargs):
@@ -10,6 +19,7 @@ try:
                 proxy_val = kwargs.pop('proxy')
                 if proxy_val is not None and 'proxies' not in kwargs:
                     kwargs['proxies'] = proxy_val
+            kwargs.setdefault('limits', _HTTP_POOL_LIMITS)
             super().__init__(*args, **kwargs)
     _httpx.Client = _PatchedClient
 
@@ -32,9 +42,16 @@ from gotrue.errors import AuthApiError
 import firebase_admin
 from firebase_admin import credentials, auth
 from datetime import datetime, timezone, timedelta
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
 
 # --- Firebase Admin SDK Initialization ---
 firebase_app = None
+# initialize_app raises if the default app already exists, so setup runs under a lock
+_FIREBASE_INIT_LOCK = threading.Lock()
 
 def initialize_firebase():
     """Initializes the Firebase Admin SDK.
@@ -44,40 +61,51 @@ def initialize_firebase():
     if firebase_app:
         return
 
-    key_path = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
-
-    # If the path is missing or file doesn't exist, try JSON env var -> write to /tmp
-    if not key_path or not os.path.exists(key_path):
-        json_blob = os.environ.get("FIREBASE_SERVICE_ACCOUNT_JSON")
-        if json_blob:
-            try:
-                tmp_path = "/tmp/firebase_sa.json"
-                with open(tmp_path, "w", encoding="utf-8") as f:
-                    f.write(json_blob)
-                os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = tmp_path
-                key_path = tmp_path
-            except Exception as e:
-                print(f"Failed to write FIREBASE_SERVICE_ACCOUNT_JSON to /tmp: {e}")
+    with _FIREBASE_INIT_LOCK:
+        # Another thread may have finished initializing while this one waited
+        if firebase_app:
+            return
 
-    # Fallback to local service account file in repo if still missing
-    if (not key_path or not os.path.exists(key_path)) and os.path.exists(
-        "bsemonitoring-64a8e-firebase-adminsdk-fbsvc-cb5ca4b412.json"
-    ):
-        key_path = "bsemonitoring-64a8e-firebase-adminsdk-fbsvc-cb5ca4b412.json"
-        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = key_path
+        key_path = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
 
-    if not key_path or not os.path.exists(key_path):
-        print("CRITICAL ERROR: Firebase service account key not found.")
-        return
+        # If the path is missing or file doesn't exist, try JSON env var -> write to /tmp
+        if not key_path or not os.path.exists(key_path):
+            json_blob = os.environ.get("FIREBASE_SERVICE_ACCOUNT_JSON")
+            if json_blob:
+                try:
+                    tmp_path = "/tmp/firebase_sa.json"
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        f.write(json_blob)
+                    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = tmp_path
+                    key_path = tmp_path
+                except Exception as e:
+                    print(f"Failed to write FIREBASE_SERVICE_ACCOUNT_JSON to /tmp: {e}")
+
+        # Fallback to local service account file in repo if still missing
+        if (not key_path or not os.path.exists(key_path)) and os.path.exists(
+            "bsemonitoring-64a8e-firebase-adminsdk-fbsvc-cb5ca4b412.json"
+        ):
+            key_path = "bsemonitoring-64a8e-firebase-adminsdk-fbsvc-cb5ca4b412.json"
+            os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = key_path
+
+        if not key_path or not os.path.exists(key_path):
+            print("CRITICAL ERROR: Firebase service account key not found.")
+            return
 
-    try:
-        cred = credentials.Certificate(key_path)
-        firebase_app = firebase_admin.initialize_app(cred)
-        print("Firebase Admin SDK initialized successfully.")
-    except Exception as e:
-        print(f"CRITICAL ERROR: Failed to initialize Firebase Admin SDK: {e}")
+        try:
+            cred = credentials.Certificate(key_path)
+            firebase_app = firebase_admin.initialize_app(cred)
+            print("Firebase Admin SDK initialized successfully.")
+        except Exception as e:
+            print(f"CRITICAL ERROR: Failed to initialize Firebase Admin SDK: {e}")
 
 # --- Supabase Client Initialization ---
+# All database access goes through PostgREST over HTTPS (supabase-py), so Postgres
+# connections are pooled on Supabase's side. If a direct driver (psycopg2/asyncpg/
+# SQLAlchemy) is ever added, point it at the Supavisor pooler in transaction mode
+# (port 6543) with a small pool, e.g. pool_size=3, max_overflow=2, pool_pre_ping=True,
+# pool_recycle=1800, pool_timeout=30, and keep transactions short: transaction mode
+# does not keep prepared statements or SET across queries.
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
 SUPABASE_SERVICE_KEY = os.environ.get("SUPABASE_SERVICE_KEY")
@@ -100,15 +128,106 @@ def _suppress_proxy_env_for_supabase():
 TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_API_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
 
+# Pooled HTTP sessions: keep-alive connections are reused across sends instead
+# of a new TCP+TLS handshake per request
+import requests as _requests
+from requests.adapters import HTTPAdapter as _HTTPAdapter
+
+class _BoundedSession(_requests.Session):
+    """Session that caps its in-flight requests across every thread using it.
+    Fan-outs nest (cron users x recipients / scrips), so the per-host ceiling
+    lives here rather than in any one pool's max_workers.
+    """
+    def __init__(self, max_in_flight):
+        super().__init__()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+
+    def request(self, *args, **kwargs):
+        with self._slots:
+            return super().request(*args, **kwargs)
+
+def _pooled_session(headers=None, max_in_flight=8):
+    s = _BoundedSession(max_in_flight)
+    s.mount('https://', _HTTPAdapter(pool_connections=10, pool_maxsize=100))
+    if headers:
+        s.headers.update(headers)
+    return s
+
+# Process-wide cap on concurrent Telegram API calls, whatever the fan-out depth
+TELEGRAM_MAX_IN_FLIGHT = int(os.environ.get("TELEGRAM_MAX_IN_FLIGHT", "8"))
+_TG_SESSION = _pooled_session(max_in_flight=TELEGRAM_MAX_IN_FLIGHT)
+
+# Concurrent Telegram API calls per fan-out (one message to many recipients)
+TELEGRAM_SEND_WORKERS = int(os.environ.get("TELEGRAM_SEND_WORKERS", "8"))
+# Extra attempts after a 429, each waiting the retry_after Telegram asks for
+TELEGRAM_429_RETRIES = int(os.environ.get("TELEGRAM_429_RETRIES", "2"))
+
+def _tg_post(method, **kwargs):
+    """POST a Bot API method, waiting out 429 Too Many Requests responses.
+    Returns the last response; file objects in `files` are rewound per attempt.
+    """
+    import time
+    for attempt in range(TELEGRAM_429_RETRIES + 1):
+        for f in (kwargs.get('files') or {}).values():
+            if isinstance(f, tuple) and hasattr(f[1], 'seek'):
+                f[1].seek(0)
+        response = _TG_SESSION.post(f"{TELEGRAM_API_URL}/{method}", **kwargs)
+        if response.status_code != 429 or attempt == TELEGRAM_429_RETRIES:
+            return response
+        try:
+            retry_after = float(response.json().get('parameters', {}).get('retry_after', 1))
+        except Exception:
+            retry_after = float(response.headers.get('Retry-After', 1))
+        logger.warning("Telegram %s rate limited, retrying in %ss", method, retry_after)
+        # Sleep outside the session's slot so other sends keep flowing
+        time.sleep(min(retry_after, 30))
+    return response
+
+def _fan_out(fn, items, max_workers):
+    """Apply fn to each item on a bounded thread pool and return the results in order.
+    The calls are blocking HTTP requests on the pooled sessions, so threads overlap the waits.
+    """
+    items = list(items)
+    if len(items) <= 1:
+        return [fn(x) for x in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as ex:
+        return list(ex.map(fn, items))
+
 # Yahoo Finance session and cache
+# Process-wide cap on concurrent Yahoo requests
+YAHOO_MAX_IN_FLIGHT = int(os.environ.get("YAHOO_MAX_IN_FLIGHT", "8"))
 _YAHOO_SESSION = None
-_YAHOO_CACHE_SERIES = {}
 _YAHOO_CACHE_TTL = int(os.environ.get("YAHOO_CACHE_TTL", "60"))
+# Bounded LRU of chart series: key -> (expires_at, series), least recently used first.
+# Shared by cron/request worker threads, hence the lock.
+_YAHOO_CACHE_SERIES = OrderedDict()
+_YAHOO_CACHE_MAX = 2048
+_YAHOO_CACHE_LOCK = threading.Lock()
+
+def _yahoo_cache_get(key, now):
+    with _YAHOO_CACHE_LOCK:
+        cached = _YAHOO_CACHE_SERIES.get(key)
+        if cached is None:
+            return None
+        expires_at, series = cached
+        if now >= expires_at:
+            del _YAHOO_CACHE_SERIES[key]
+            return None
+        _YAHOO_CACHE_SERIES.move_to_end(key)
+        return series
+
+def _yahoo_cache_put(key, series, now):
+    # Up to 20% jitter so series fetched together don't all expire (and refetch) together
+    expires_at = now + _YAHOO_CACHE_TTL * (1 + random.uniform(0, 0.2))
+    with _YAHOO_CACHE_LOCK:
+        _YAHOO_CACHE_SERIES[key] = (expires_at, series)
+        _YAHOO_CACHE_SERIES.move_to_end(key)
+        while len(_YAHOO_CACHE_SERIES) > _YAHOO_CACHE_MAX:
+            _YAHOO_CACHE_SERIES.popitem(last=False)
 
 # ---- Price helpers (CMP vs previous close with robust fallbacks) ----
 import re as _re
 from bs4 import BeautifulSoup as _BS
-import requests as _requests
 import yfinance as _yf
 
 def _yahoo_symbol_to_bse_code(sym: str):
@@ -123,7 +242,7 @@ def _yahoo_symbol_to_bse_code(sym: str):
 def _fetch_chart_meta(sym: str):
     try:
         url = f"https://query1.finance.yahoo.com/v8/finance/chart/{sym}?range=1d&interval=1m"
-        r = _requests.get(url, timeout=10)
+        r = get_yahoo_session().get(url, timeout=10)
         if r.status_code != 200:
             return None
         data = r.json()
@@ -138,7 +257,7 @@ def _fetch_chart_meta(sym: str):
 def _fetch_quote_price(sym: str):
     try:
         url = f"https://query1.finance.yahoo.com/v7/finance/quote?symbols={sym}"
-        r = _requests.get(url, timeout=10)
+        r = get_yahoo_session().get(url, timeout=10)
         if r.status_code != 200:
             return None
         data = r.json()
@@ -250,7 +369,7 @@ def _latest_cmp(sym: str):
 
 def _daily_closes(sym: str):
     s_daily = yahoo_chart_series_cached(sym, '10d', '1d')
-    closes = s_daily.dropna() if (s_daily is not None and not s_daily.empty) else None
+    closes = s_daily if (s_daily is not None and not s_daily.empty) else None
     last_close = float(closes.iloc[-1]) if (closes is not None and len(closes) >= 1) else None
     prev_close = float(closes.iloc[-2]) if (closes is not None and len(closes) >= 2) else None
     prev_prev_close = float(closes.iloc[-3]) if (closes is not None and len(closes) >= 3) else None
@@ -324,42 +443,55 @@ def get_company_df():
             _COMPANY_DF = None
     return _COMPANY_DF
 
-def bse_code_to_yahoo_symbol(bse_code):
-    df = get_company_df()
-    if df is None:
-        return None
+_BSE_TO_YAHOO = None  # normalized BSE code -> Yahoo symbol, built on first use
+
+def _bse_key(bse_code):
+    """Normalize a BSE code ('500002', 500002, 500002.0) to one dict key."""
+    s = str(bse_code).strip()
     try:
-        bse_code_int = int(str(bse_code))
-        row = df[df['BSE Code'] == bse_code_int]
-    except Exception:
-        row = df[df['BSE Code'].astype(str) == str(bse_code)]
-    if row is None or row.empty:
-        return None
-    sym = str(row.iloc[0].get('Yahoo Symbol', '')).strip()
-    return sym or None
+        return str(int(float(s)))
+    except (ValueError, OverflowError):
+        # Not a number, or 'inf'/'1e400' which int() can't represent
+        return s
+
+def _get_bse_to_yahoo():
+    global _BSE_TO_YAHOO
+    if _BSE_TO_YAHOO is None:
+        df = get_company_df()
+        if df is None:
+            return {}
+        mapping = {}
+        for code, sym in zip(df['BSE Code'], df['Yahoo Symbol']):
+            if code != code or sym != sym:  # NaN
+                continue
+            sym = str(sym).strip()
+            if sym:
+                # First CSV row wins, as with the old DataFrame lookup
+                mapping.setdefault(_bse_key(code), sym)
+        _BSE_TO_YAHOO = mapping
+    return _BSE_TO_YAHOO
+
+def bse_code_to_yahoo_symbol(bse_code):
+    return _get_bse_to_yahoo().get(_bse_key(bse_code))
 
 def get_yahoo_session():
     global _YAHOO_SESSION
     if _YAHOO_SESSION is None:
-        import requests
-        s = requests.Session()
-        s.headers.update({'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36'})
-        _YAHOO_SESSION = s
+        # Pooled like the Telegram/BSE sessions: chart fetches run on several threads at once
+        _YAHOO_SESSION = _pooled_session({'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36'}, max_in_flight=YAHOO_MAX_IN_FLIGHT)
     return _YAHOO_SESSION
 
 def yahoo_chart_series_cached(symbol: str, range_str: str, interval: str):
-    # Returns pandas Series of closes indexed by datetime, or None
+    # Returns pandas Series of closes indexed by datetime (NaNs already dropped), or None
     import time
     import pandas as pd
     session = get_yahoo_session()
     key = (symbol, range_str, interval)
     # Check cache
-    cached = _YAHOO_CACHE_SERIES.get(key)
     now = time.time()
+    cached = _yahoo_cache_get(key, now)
     if cached is not None:
-        ts, series = cached
-        if now - ts < _YAHOO_CACHE_TTL:
-            return series
+        return cached
     # Fetch
     try:
         url = f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}?range={range_str}&interval={interval}"
@@ -378,18 +510,33 @@ def yahoo_chart_series_cached(symbol: str, range_str: str, interval: str):
         if not closes or not timestamps:
             return None
         s = pd.Series(closes, index=pd.to_datetime(timestamps, unit='s')).dropna()
-        _YAHOO_CACHE_SERIES[key] = (now, s)
+        _yahoo_cache_put(key, s, now)
         return s
     except Exception as e:
         if os.environ.get("YAHOO_VERBOSE", "0") == "1":
             print(f"Chart API error for {symbol} {range_str}/{interval}: {e}")
         return None
 
+# Concurrent Yahoo chart requests when loading several symbols at once
+YAHOO_FETCH_WORKERS = int(os.environ.get("YAHOO_FETCH_WORKERS", "8"))
+
+def yahoo_chart_series_batch(symbols, range_str: str, interval: str) -> dict:
+    """Return {symbol: Series or None} for every symbol, fetching them concurrently.
+    Each symbol goes through yahoo_chart_series_cached, so cached series cost no request.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    series = _fan_out(lambda sym: yahoo_chart_series_cached(sym, range_str, interval), symbols, YAHOO_FETCH_WORKERS)
+    return dict(zip(symbols, series))
+
 supabase_anon: Client = None
 supabase_service: Client = None
+# Guards client creation so concurrent first requests don't each build a client
+_SUPABASE_INIT_LOCK = threading.Lock()
 
 def get_supabase_client(service_role=False):
     """Initializes and returns the appropriate Supabase client.
+    Clients are created once per process and shared, so every caller reuses
+    the same HTTP connection pool.
     Returns None if configuration is missing or initialization fails.
     """
     global supabase_anon, supabase_service
@@ -398,26 +545,30 @@ def get_supabase_client(service_role=False):
             if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
                 print("CRITICAL: Supabase Service Key not set.")
                 return None
-            try:
-                _suppress_proxy_env_for_supabase()
-                supabase_service = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-            except Exception as e:
-                print(f"CRITICAL: Failed to initialize Supabase service client: {e}")
-                supabase_service = None
-                return None
+            with _SUPABASE_INIT_LOCK:
+                if supabase_service is None:
+                    try:
+                        _suppress_proxy_env_for_supabase()
+                        supabase_service = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+                    except Exception as e:
+                        print(f"CRITICAL: Failed to initialize Supabase service client: {e}")
+                        supabase_service = None
+                        return None
         return supabase_service
     else:
         if supabase_anon is None:
             if not SUPABASE_URL or not SUPABASE_KEY:
                 print("CRITICAL: Supabase Anon Key not set.")
                 return None
-            try:
-                _suppress_proxy_env_for_supabase()
-                supabase_anon = create_client(SUPABASE_URL, SUPABASE_KEY)
-            except Exception as e:
-                print(f"CRITICAL: Failed to initialize Supabase anon client: {e}")
-                supabase_anon = None
-                return None
+            with _SUPABASE_INIT_LOCK:
+                if supabase_anon is None:
+                    try:
+                        _suppress_proxy_env_for_supabase()
+                        supabase_anon = create_client(SUPABASE_URL, SUPABASE_KEY)
+                    except Exception as e:
+                        print(f"CRITICAL: Failed to initialize Supabase anon client: {e}")
+                        supabase_anon = None
+                        return None
         return supabase_anon
 
 # --- Unified User Authentication Logic ---
@@ -459,11 +610,11 @@ def find_or_create_supabase_user(decoded_token):
     uid_column = 'google_uid' if provider == 'google.com' else 'firebase_uid'
 
     # 1. Try to find an existing user
-    profile_response = sb_admin.table('profiles').select('id, email').eq(uid_column, provider_uid).execute()
+    profile_response = sb_admin.table('profiles').select('id, email').eq(uid_column, provider_uid).limit(1).execute()
     profile = profile_response.data[0] if profile_response.data else None
     
     if not profile and email:
-        profile_response = sb_admin.table('profiles').select('id, email').eq('email', email).execute()
+        profile_response = sb_admin.table('profiles').select('id, email').eq('email', email).limit(1).execute()
         profile = profile_response.data[0] if profile_response.data else None
         if profile:
             sb_admin.table('profiles').update({uid_column: provider_uid}).eq('id', profile['id']).execute()
@@ -471,7 +622,8 @@ def find_or_create_supabase_user(decoded_token):
     # If we found an existing profile, return identifiers and allow app session login
     if profile:
         # If we have a better email now, update profiles and auth.users when placeholder is present
-        if email and (not profile.get('email') or profile.get('email', '').endswith('@yourapp.com')):
+        current_email = profile.get('email') or ''
+        if email and email.lower() != current_email.lower() and (not current_email or current_email.endswith('@yourapp.com')):
             try:
                 sb_admin.table('profiles').update({'email': email}).eq('id', profile['id']).execute()
                 try:
@@ -480,6 +632,7 @@ def find_or_create_supabase_user(decoded_token):
                     # Non-fatal if auth update fails
                     pass
                 profile['email'] = email
+                invalidate_admin_users_cache()
             except Exception:
                 pass
         return {
@@ -505,6 +658,7 @@ def find_or_create_supabase_user(decoded_token):
         new_user = new_user_response.user
         
         sb_admin.table('profiles').update({uid_column: provider_uid}).eq('id', new_user.id).execute()
+        invalidate_admin_users_cache()
         
         # Skip generating Supabase session links; authenticate app-side via Flask session
         return {
@@ -585,6 +739,36 @@ def add_user_scrip(user_client, user_id: str, bse_code: str, company_name: str):
 def delete_user_scrip(user_client, user_id: str, bse_code: str):
     user_client.table('monitored_scrips').delete().eq('user_id', user_id).eq('bse_code', bse_code).execute()
 
+# Whether telegram_recipients has the (user_id, chat_id) unique constraint
+# (supabase/migrations) to upsert on; None until the first addition finds out
+_HAS_RECIPIENTS_UNIQUE = None
+
+def _insert_recipient_if_missing(client, user_id: str, chat_id_str: str):
+    """Insert the (user_id, chat_id) pair unless it already exists."""
+    global _HAS_RECIPIENTS_UNIQUE
+    row = {'user_id': user_id, 'chat_id': chat_id_str}
+    if _HAS_RECIPIENTS_UNIQUE is not False:
+        try:
+            client.table('telegram_recipients').upsert(row, on_conflict='user_id,chat_id', ignore_duplicates=True).execute()
+            _HAS_RECIPIENTS_UNIQUE = True
+            return
+        except Exception as e:
+            # No unique constraint to conflict on: check then insert from now on
+            if 'on conflict' not in str(e).lower():
+                raise
+            _HAS_RECIPIENTS_UNIQUE = False
+    existing = (
+        client.table('telegram_recipients')
+        .select('user_id')
+        .eq('user_id', user_id)
+        .eq('chat_id', chat_id_str)
+        .limit(1)
+        .execute()
+    )
+    if existing.data:
+        return
+    client.table('telegram_recipients').insert(row).execute()
+
 def add_user_recipient(user_client, user_id: str, chat_id: str):
     """
     Allow the same chat_id to be associated with multiple users.
@@ -594,18 +778,7 @@ def add_user_recipient(user_client, user_id: str, chat_id: str):
     """
     chat_id_str = str(chat_id).strip()
     try:
-        # Check exact pair exists
-        existing = (
-            user_client.table('telegram_recipients')
-            .select('user_id')
-            .eq('user_id', user_id)
-            .eq('chat_id', chat_id_str)
-            .limit(1)
-            .execute()
-        )
-        if existing.data:
-            return
-        user_client.table('telegram_recipients').insert({'user_id': user_id, 'chat_id': chat_id_str}).execute()
+        _insert_recipient_if_missing(user_client, user_id, chat_id_str)
     except Exception:
         # Best-effort insert
         try:
@@ -616,18 +789,93 @@ def add_user_recipient(user_client, user_id: str, chat_id: str):
 def delete_user_recipient(user_client, user_id: str, chat_id: str):
     user_client.table('telegram_recipients').delete().eq('user_id', user_id).eq('chat_id', chat_id).execute()
 
+# --- Cron helpers ---
+# Whether the active_cron_users function (supabase/migrations) is installed;
+# None until the first cron run in this process finds out
+_HAS_ACTIVE_CRON_USERS_RPC = None
+
+def get_active_cron_users(sb):
+    """Return [(user_id, scrips, recipients)] for every user with monitored scrips.
+    Users without recipients are included (with an empty list) so the cron
+    can still record them as skipped.
+    Uses the active_cron_users RPC when installed (one request, grouped in
+    Postgres); otherwise reads both tables and groups them here.
+    """
+    global _HAS_ACTIVE_CRON_USERS_RPC
+    if _HAS_ACTIVE_CRON_USERS_RPC is not False:
+        try:
+            rows = sb.rpc('active_cron_users').execute().data or []
+            _HAS_ACTIVE_CRON_USERS_RPC = True
+            return [(sys.intern(r['user_id']), r.get('scrips') or [], r.get('recipients') or []) for r in rows if r.get('user_id')]
+        except Exception as e:
+            if 'active_cron_users' not in str(e):
+                raise
+            # Not installed: use the table reads for the life of the process
+            _HAS_ACTIVE_CRON_USERS_RPC = False
+
+    scrip_rows = sb.table('monitored_scrips').select('user_id, bse_code, company_name').execute().data or []
+    rec_rows = sb.table('telegram_recipients').select('user_id, chat_id').execute().data or []
+
+    scrips_by_user = defaultdict(list)
+    for r in scrip_rows:
+        uid = r.get('user_id')
+        if not uid:
+            continue
+        uid = sys.intern(uid)  # one shared string per user across both maps
+        scrips_by_user[uid].append({'bse_code': r.get('bse_code'), 'company_name': r.get('company_name')})
+
+    recs_by_user = defaultdict(list)
+    for r in rec_rows:
+        uid = r.get('user_id')
+        if not uid:
+            continue
+        recs_by_user[uid].append({'chat_id': r.get('chat_id')})
+
+    return [(uid, scrips, recs_by_user.get(uid) or []) for uid, scrips in scrips_by_user.items()]
+
 
 # --- Admin helpers ---
+# The admin user list changes rarely but is read on every admin page view
+_ADMIN_USERS_CACHE = None  # (fetched_at, users)
+_ADMIN_USERS_CACHE_TTL = 30
+
+def invalidate_admin_users_cache():
+    global _ADMIN_USERS_CACHE
+    _ADMIN_USERS_CACHE = None
+
 def admin_get_all_users():
+    global _ADMIN_USERS_CACHE
+    import time
+    now = time.time()
+    if _ADMIN_USERS_CACHE is not None and now - _ADMIN_USERS_CACHE[0] < _ADMIN_USERS_CACHE_TTL:
+        return _ADMIN_USERS_CACHE[1]
     sb_admin = get_supabase_client(service_role=True)
     resp = sb_admin.table('profiles').select('id, email').order('email').execute()
-    return resp.data or []
+    users = resp.data or []
+    _ADMIN_USERS_CACHE = (now, users)
+    return users
 
 def admin_get_user_details(user_id: str):
     sb_admin = get_supabase_client(service_role=True)
-    profile = sb_admin.table('profiles').select('id, email').eq('id', user_id).single().execute().data
-    scrips = sb_admin.table('monitored_scrips').select('bse_code, company_name').eq('user_id', user_id).execute().data or []
-    recipients = sb_admin.table('telegram_recipients').select('chat_id').eq('user_id', user_id).execute().data or []
+    # One round trip: PostgREST embeds the related rows via the user_id foreign keys
+    try:
+        profile = (
+            sb_admin.table('profiles')
+            .select('id, email, monitored_scrips(bse_code, company_name), telegram_recipients(chat_id)')
+            .eq('id', user_id)
+            .single()
+            .execute()
+            .data
+        )
+        scrips = profile.get('monitored_scrips') or []
+        recipients = profile.get('telegram_recipients') or []
+    except Exception as e:
+        # Embedding needs the user_id foreign keys declared; read each table otherwise
+        if 'relationship' not in str(e).lower():
+            raise
+        profile = sb_admin.table('profiles').select('id, email').eq('id', user_id).single().execute().data
+        scrips = sb_admin.table('monitored_scrips').select('bse_code, company_name').eq('user_id', user_id).execute().data or []
+        recipients = sb_admin.table('telegram_recipients').select('chat_id').eq('user_id', user_id).execute().data or []
     return {
         'id': profile['id'],
         'email': profile.get('email', '') or '',
@@ -647,10 +895,7 @@ def admin_add_recipient_for_user(user_id: str, chat_id: str):
     sb_admin = get_supabase_client(service_role=True)
     chat_id_str = str(chat_id).strip()
     # Allow duplicates (user_id, chat_id) combinations
-    existing = sb_admin.table('telegram_recipients').select('user_id').eq('user_id', user_id).eq('chat_id', chat_id_str).limit(1).execute()
-    if existing.data:
-        return
-    sb_admin.table('telegram_recipients').insert({'user_id': user_id, 'chat_id': chat_id_str}).execute()
+    _insert_recipient_if_missing(sb_admin, user_id, chat_id_str)
 
 def admin_delete_recipient_for_user(user_id: str, chat_id: str):
     sb_admin = get_supabase_client(service_role=True)
@@ -662,42 +907,36 @@ def send_telegram_message(chat_id: str, message: str):
     Sends a message to a Telegram chat using the bot API.
     Returns True if successful, False otherwise.
     """
-    import requests
-    import json
-
     if not TELEGRAM_BOT_TOKEN:
-        print("❌ Telegram bot token missing. Set TELEGRAM_BOT_TOKEN in your .env and restart the app.")
+        logger.error("Telegram bot token missing. Set TELEGRAM_BOT_TOKEN in your .env and restart the app.")
         return False
     
     try:
+        # Sent as plain text: messages carry company names and prices, where
+        # Markdown entities ('_', '*') would make Telegram reject the send
         payload = {
             'chat_id': chat_id,
             'text': message,
-            'parse_mode': 'Markdown'
         }
         
-        response = requests.post(
-            f"{TELEGRAM_API_URL}/sendMessage",
-            json=payload,
-            timeout=10
-        )
+        response = _tg_post('sendMessage', json=payload, timeout=10)
         
         if response.status_code == 200:
             result = response.json()
             if result.get('ok'):
-                print(f"✅ Message sent successfully to Telegram {chat_id}")
+                logger.info("Message sent successfully to Telegram %s", chat_id)
                 return True
             else:
-                print(f"❌ Telegram API error: {result.get('description', 'Unknown error')}")
+                logger.error("Telegram API error: %s", result.get('description', 'Unknown error'))
                 return False
         else:
-            print(f"❌ HTTP error {response.status_code}: {response.text}")
+            logger.error("Telegram HTTP error %s: %s", response.status_code, response.text)
             if response.status_code == 404:
-                print("Hint: 404 from Telegram often means an invalid bot token or malformed URL. Double-check TELEGRAM_BOT_TOKEN and ensure you started a chat with the bot.")
+                logger.error("Hint: 404 from Telegram often means an invalid bot token or malformed URL. Double-check TELEGRAM_BOT_TOKEN and ensure you started a chat with the bot.")
             return False
             
     except Exception as e:
-        print(f"❌ Error sending Telegram message: {e}")
+        logger.error("Error sending Telegram message: %s", e)
         return False
 
 # --- Script Message Functions ---
@@ -826,6 +1065,9 @@ BSE_HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36',
     'Referer': 'https://www.bseindia.com/'
 }
+# Process-wide cap on concurrent BSE requests (per-user fetches run under the cron pool)
+BSE_MAX_IN_FLIGHT = int(os.environ.get("BSE_MAX_IN_FLIGHT", "8"))
+_BSE_SESSION = _pooled_session(BSE_HEADERS, max_in_flight=BSE_MAX_IN_FLIGHT)
 
 IST_OFFSET = timedelta(hours=5, minutes=30)
 IST_TZ = timezone(IST_OFFSET, name="IST")
@@ -847,46 +1089,47 @@ def ist_now():
     # Return timezone-aware IST datetime
     return datetime.now(IST_TZ)
 
-def db_seen_announcement_exists(user_client, user_id: str, news_id: str) -> bool:
-    """Check if announcement already recorded.
+def db_seen_announcement_ids(user_client, user_id: str, news_ids) -> set:
+    """Return the subset of news_ids already recorded for this user, in one
+    query per 200 ids instead of one per announcement.
     If the schema lacks user_id, fallback to global check by news_id only.
     """
-    try:
-        resp = (
-            user_client
-            .table('seen_announcements')
-            .select('news_id', count='exact')
-            .eq('news_id', news_id)
-            .eq('user_id', user_id)
-            .execute()
-        )
-        return (getattr(resp, 'count', 0) or 0) > 0
-    except Exception as e:
-        msg = str(e).lower()
-        # Fallback when user_id column is missing: de-dup globally by news_id
-        if 'user_id' in msg and ('column' in msg or 'does not exist' in msg):
-            try:
-                resp2 = (
-                    user_client
-                    .table('seen_announcements')
-                    .select('news_id', count='exact')
-                    .eq('news_id', news_id)
-                    .execute()
-                )
-                return (getattr(resp2, 'count', 0) or 0) > 0
-            except Exception:
-                return False
-        # Otherwise do not block sending
+    news_ids = list(dict.fromkeys(news_ids))
+    seen = set()
+    for i in range(0, len(news_ids), 200):
+        chunk = news_ids[i:i + 200]
         try:
-            print(f"seen_announcements lookup failed, treating as new: {e}")
-        except Exception:
-            pass
-        return False
+            rows = (
+                user_client
+                .table('seen_announcements')
+                .select('news_id')
+                .eq('user_id', user_id)
+                .in_('news_id', chunk)
+                .execute()
+                .data or []
+            )
+        except Exception as e:
+            msg = str(e).lower()
+            # Fallback when user_id column is missing: de-dup globally by news_id
+            if 'user_id' in msg and ('column' in msg or 'does not exist' in msg):
+                try:
+                    rows = user_client.table('seen_announcements').select('news_id').in_('news_id', chunk).execute().data or []
+                except Exception:
+                    rows = []
+            else:
+                # Otherwise do not block sending
+                try:
+                    print(f"seen_announcements lookup failed, treating as new: {e}")
+                except Exception:
+                    pass
+                rows = []
+        seen.update(r.get('news_id') for r in rows)
+    return seen
 
 from typing import Optional
 
-def db_save_seen_announcement(user_client, user_id: str, news_id: str, scrip_code: str, headline: str, pdf_name: str, ann_dt_iso: str, caption: str, category: Optional[str] = None):
-    payload = {
+def _seen_announcement_row(user_id: str, news_id: str, scrip_code: str, headline: str, pdf_name: str, ann_dt_iso: str, caption: str, category: Optional[str] = None):
+    row = {
         'user_id': user_id,
         'news_id': news_id,
         'scrip_code': scrip_code,
@@ -895,12 +1138,16 @@ def db_save_seen_announcement(user_client, user_id: str, news_id: str, scrip_cod
         'ann_date': ann_dt_iso,
         'caption': caption,
     }
-    # Try insert with category first
     if category is not None:
-        payload_with_cat = dict(payload)
-        payload_with_cat['category'] = category
-    else:
-        payload_with_cat = payload
+        row['category'] = category
+    return row
+
+def _without_category(row):
+    return {k: v for k, v in row.items() if k != 'category'}
+
+def db_save_seen_announcement(user_client, user_id: str, news_id: str, scrip_code: str, headline: str, pdf_name: str, ann_dt_iso: str, caption: str, category: Optional[str] = None):
+    # Try insert with category first
+    payload_with_cat = _seen_announcement_row(user_id, news_id, scrip_code, headline, pdf_name, ann_dt_iso, caption, category)
     try:
         user_client.table('seen_announcements').insert(payload_with_cat).execute()
         return
@@ -909,13 +1156,43 @@ def db_save_seen_announcement(user_client, user_id: str, news_id: str, scrip_cod
         # Retry without category if the column doesn't exist
         if 'category' in msg and ('column' in msg or 'does not exist' in msg):
             try:
-                user_client.table('seen_announcements').insert(payload).execute()
+                user_client.table('seen_announcements').insert(_without_category(payload_with_cat)).execute()
                 return
             except Exception:
                 pass
         # Ignore duplicates and other transient errors silently
         return
 
+def db_save_seen_announcements(user_client, rows: list[dict]):
+    """Insert many seen_announcements rows (built by _seen_announcement_row) at once.
+    Retries without category if that column is missing; on any other error
+    (e.g. one duplicate rejecting the batch) falls back to row-by-row inserts,
+    which ignore duplicates individually.
+    """
+    if not rows:
+        return
+    # A bulk insert needs the same keys on every row
+    if any('category' in r for r in rows):
+        rows = [r if 'category' in r else {**r, 'category': None} for r in rows]
+    try:
+        user_client.table('seen_announcements').insert(rows).execute()
+        return
+    except Exception as e:
+        msg = str(e).lower()
+        if 'category' in msg and ('column' in msg or 'does not exist' in msg):
+            rows = [_without_category(r) for r in rows]
+            try:
+                user_client.table('seen_announcements').insert(rows).execute()
+                return
+            except Exception:
+                pass
+    for row in rows:
+        try:
+            user_client.table('seen_announcements').insert(row).execute()
+        except Exception:
+            # Ignore duplicates and other transient errors silently
+            pass
+
 ALLOWED_ANNOUNCEMENT_CATEGORIES = {
     'financials',
     'rating',
@@ -958,17 +1235,32 @@ def classify_bse_headline(headline: str):
 
     return None
 
-def fetch_bse_announcements_for_scrip(scrip_code: str, since_dt, allowed_categories: list[str] | None = None) -> list[dict]:
-    import requests
+def _bse_date_format(s: str) -> str:
+    """Pick the one strptime format matching a BSE date string's shape (several formats observed)."""
+    with_seconds = s.count(':') >= 2
+    if s[4:5] == '-':
+        if s[10:11] == 'T':
+            return '%Y-%m-%dT%H:%M:%S.%f' if '.' in s else '%Y-%m-%dT%H:%M:%S'  # 2024-11-08T17:25:00[.000]
+        return '%Y-%m-%d %H:%M:%S' if with_seconds else '%Y-%m-%d %H:%M'  # 2024-11-08 17:25[:00]
+    if s[-2:].upper() in ('AM', 'PM'):
+        return '%d %b %Y %I:%M:%S %p' if with_seconds else '%d %b %Y %I:%M %p'  # 08 Nov 2024 05:25[:00] PM
+    return '%d %b %Y %H:%M:%S' if with_seconds else '%d %b %Y %H:%M'  # 08 Nov 2024 17:25[:00]
+
+def _bse_date_range() -> tuple[str, str]:
+    """Return the (from, to) query dates for BSE announcements: the last 7 days in IST."""
+    now = ist_now()
+    return (now - timedelta(days=7)).strftime('%Y%m%d'), now.strftime('%Y%m%d')
+
+def fetch_bse_announcements_for_scrip(scrip_code: str, since_dt, allowed_categories: list[str] | None = None, date_range: tuple[str, str] | None = None) -> list[dict]:
     results = []
     try:
-        from_date_str = (ist_now() - timedelta(days=7)).strftime('%Y%m%d')
-        to_date_str = ist_now().strftime('%Y%m%d')
+        # Callers fetching many scrips compute the range once and pass it in
+        from_date_str, to_date_str = date_range or _bse_date_range()
         params = {
             'strCat': '-1', 'strPrevDate': from_date_str, 'strToDate': to_date_str,
             'strScrip': scrip_code, 'strSearch': 'P', 'strType': 'C'
         }
-        r = requests.get(BSE_API_URL, headers=BSE_HEADERS, params=params, timeout=30)
+        r = _BSE_SESSION.get(BSE_API_URL, params=params, timeout=30)
         if os.environ.get('BSE_VERBOSE', '0') == '1':
             try:
                 print(f"BSE fetch {scrip_code}: HTTP {r.status_code} url={r.url}")
@@ -984,7 +1276,7 @@ def fetch_bse_announcements_for_scrip(scrip_code: str, since_dt, allowed_categor
                 'strCat': '-1', 'strPrevDate': from_date_str, 'strToDate': to_date_str,
                 'strScrip': scrip_code, 'strSearch': '', 'strType': 'C'
             }
-            r2 = requests.get(BSE_API_URL, headers=BSE_HEADERS, params=params2, timeout=30)
+            r2 = _BSE_SESSION.get(BSE_API_URL, params=params2, timeout=30)
             data2 = r2.json() if r2.status_code == 200 else {}
             table = data2.get('Table') or []
             if os.environ.get('BSE_VERBOSE', '0') == '1':
@@ -997,24 +1289,12 @@ def fetch_bse_announcements_for_scrip(scrip_code: str, since_dt, allowed_categor
             ann_date_str = ann.get('NEWS_DT') or ann.get('DissemDT')
             if not ann_date_str:
                 continue
-            # Parse announcement date (several formats observed)
-            dt_parsed = None
-            formats = (
-                '%d %b %Y %I:%M:%S %p',  # e.g., 08 Nov 2024 05:25:00 PM
-                '%d %b %Y %I:%M %p',     # e.g., 08 Nov 2024 05:25 PM
-                '%d %b %Y %H:%M:%S',     # e.g., 08 Nov 2024 17:25:00
-                '%d %b %Y %H:%M',        # e.g., 08 Nov 2024 17:25
-                '%Y-%m-%d %H:%M:%S',     # e.g., 2024-11-08 17:25:00
-                '%Y-%m-%d %H:%M',        # e.g., 2024-11-08 17:25
-                '%Y-%m-%dT%H:%M:%S.%f',  # e.g., 2024-11-08T17:25:00.000
-                '%Y-%m-%dT%H:%M:%S',     # e.g., 2024-11-08T17:25:00
-            )
-            for fmt in formats:
-                try:
-                    dt_parsed = datetime.strptime(ann_date_str.strip(), fmt)
-                    break
-                except Exception:
-                    continue
+            # Parse announcement date with the single format its shape implies
+            ann_date_str = ann_date_str.strip()
+            try:
+                dt_parsed = datetime.strptime(ann_date_str, _bse_date_format(ann_date_str))
+            except Exception:
+                dt_parsed = None
             if not dt_parsed:
                 # Try dateutil as a robust fallback (day-first common in BSE)
                 try:
@@ -1053,6 +1333,36 @@ def fetch_bse_announcements_for_scrip(scrip_code: str, since_dt, allowed_categor
         pass
     return results
 
+# Concurrent BSE requests per user (announcement fetches and PDF downloads)
+BSE_FETCH_WORKERS = int(os.environ.get("BSE_FETCH_WORKERS", "8"))
+
+# Telegram bots cannot upload documents above 50 MB, so larger PDFs are not worth downloading
+TELEGRAM_MAX_DOCUMENT_BYTES = 50 * 1024 * 1024
+
+# Announcement PDFs each user downloads and sends at once, and the cap on PDFs
+# held in memory across the whole process (the cron runs many users in parallel)
+PDF_SEND_WORKERS = int(os.environ.get("PDF_SEND_WORKERS", "2"))
+_PDF_SLOTS = threading.BoundedSemaphore(int(os.environ.get("PDF_MAX_IN_FLIGHT", "4")))
+
+def _download_announcement_pdf(item):
+    """Return the announcement PDF as a BytesIO, or None if it can't be fetched.
+    The body is streamed into the buffer in chunks rather than held twice via resp.content.
+    """
+    try:
+        with _BSE_SESSION.get(f"{PDF_BASE_URL}{item['pdf_name']}", timeout=30, stream=True) as resp:
+            if resp.status_code != 200:
+                return None
+            buf = io.BytesIO()
+            for chunk in resp.iter_content(chunk_size=64 * 1024):
+                buf.write(chunk)
+                if buf.tell() > TELEGRAM_MAX_DOCUMENT_BYTES:
+                    return None
+            if buf.tell():
+                return buf
+    except Exception:
+        pass
+    return None
+
 def send_bse_announcements_consolidated(user_client, user_id: str, monitored_scrips, telegram_recipients, hours_back: int = 24) -> int:
     # Build a lookup from bse_code to company_name for friendly messages
     code_to_name = {}
@@ -1061,21 +1371,19 @@ def send_bse_announcements_consolidated(user_client, user_id: str, monitored_scr
             code_to_name[str(s.get('bse_code'))] = s.get('company_name') or str(s.get('bse_code'))
     except Exception:
         pass
-    import requests
-    import pandas as pd
     messages_sent = 0
     since_dt = ist_now() - timedelta(hours=hours_back)
 
-    # Fetch announcements for all scrips
-    all_new = []
-    for scrip in monitored_scrips:
-        scrip_code = scrip['bse_code']
-        # Apply per-user category preferences
-        allowed = get_user_category_prefs(user_client, user_id)
-        ann = fetch_bse_announcements_for_scrip(scrip_code, since_dt, allowed_categories=allowed)
-        for item in ann:
-            if not db_seen_announcement_exists(user_client, user_id, item['news_id']):
-                all_new.append(item)
+    # Apply per-user category preferences (same for every scrip)
+    allowed = get_user_category_prefs(user_client, user_id)
+
+    # Fetch announcements for all scrips concurrently; each fetch is a BSE round trip
+    scrip_codes = [scrip['bse_code'] for scrip in monitored_scrips]
+    date_range = _bse_date_range()
+    fetched = _fan_out(lambda code: fetch_bse_announcements_for_scrip(code, since_dt, allowed_categories=allowed, date_range=date_range), scrip_codes, BSE_FETCH_WORKERS)
+    candidates = [item for ann in fetched for item in ann]
+    seen = db_seen_announcement_ids(user_client, user_id, [item['news_id'] for item in candidates]) if candidates else set()
+    all_new = [item for item in candidates if item['news_id'] not in seen]
 
     recipients_count = len(telegram_recipients)
     ann_count = len(all_new)
@@ -1088,32 +1396,21 @@ def send_bse_announcements_consolidated(user_client, user_id: str, monitored_scr
     if not all_new:
         return 0
 
-    # Group items per scrip for nicer formatting
-    from collections import defaultdict
-    by_scrip = defaultdict(list)
-    for item in sorted(all_new, key=lambda x: x['ann_dt'], reverse=True):
-        by_scrip[item['scrip_code']].append(item)
+    # Group items per scrip for nicer formatting; only the 5 newest per scrip are listed,
+    # and scrips are ordered by their newest announcement
+    groups = defaultdict(list)
+    for item in all_new:
+        groups[item['scrip_code']].append(item)
+    newest = {code: heapq.nlargest(5, items, key=lambda x: x['ann_dt']) for code, items in groups.items()}
+    by_scrip = dict(sorted(newest.items(), key=lambda kv: kv[1][0]['ann_dt'], reverse=True))
 
     # Prepare price and % change per scrip using Yahoo fallback
     symbol_map = {}
     price_info = {}
     try:
-        company_df = pd.read_csv('indian_stock_tickers.csv')
-        def get_symbol(bse_code):
-            try:
-                bse_code_int = int(bse_code)
-                row = company_df[company_df['BSE Code'] == bse_code_int]
-            except Exception:
-                row = company_df[company_df['BSE Code'].astype(str) == str(bse_code)]
-            if row.empty:
-                return None
-            sym = str(row.iloc[0].get('Yahoo Symbol', '')).strip()
-            return sym or None
-
         # Compute for unique scrip codes in announcements
-        from math import isfinite
         for scrip_code in set(str(k) for k in by_scrip.keys()):
-            sym = get_symbol(scrip_code)
+            sym = bse_code_to_yahoo_symbol(scrip_code)
             if not sym:
                 continue
             symbol_map[scrip_code] = sym
@@ -1139,53 +1436,47 @@ def send_bse_announcements_consolidated(user_client, user_id: str, monitored_scr
     for scrip_code, items in by_scrip.items():
         company_name = code_to_name.get(str(scrip_code)) or str(scrip_code)
         price, prev_close, pct = price_info.get(str(scrip_code), (None, None, None))
-        def fmt_price(val):
-            try:
-                return f"₹{float(val):.2f}"
-            except Exception:
-                return "N/A"
         change_str = ""
         if pct is not None:
             arrow = "🔼" if pct > 0 else ("🔻" if pct < 0 else "➖")
             sign = "+" if pct > 0 else ("" if pct == 0 else "")
             change_str = f" {arrow} ({sign}{pct:.2f}%)"
-        price_line = f" — {fmt_price(price)}{change_str}" if price is not None else ""
+        price_line = f" — {_safe_fmt_inr(price)}{change_str}" if price is not None else ""
         lines.append(f"• {company_name}{price_line}")
-        for it in items[:5]:
+        for it in items:
             lines.append(f"  - {it['ann_dt'].strftime('%d-%m %H:%M')} — {it['headline']}")
         lines.append("")
     summary_text = "\n".join(lines).strip()
 
-    # Send summary first
-    for rec in telegram_recipients:
-        chat_id = rec['chat_id']
-        from requests import post
-        post(f"{TELEGRAM_API_URL}/sendMessage", json={'chat_id': chat_id, 'text': summary_text, 'parse_mode': 'HTML'}, timeout=10)
-        messages_sent += 1
+    # Send summary first, to all recipients concurrently; only delivered messages count.
+    # send_telegram_message sends plain text, since headlines routinely contain '&'
+    # and '<' that HTML parse mode would reject
+    sent = _fan_out(
+        lambda rec: send_telegram_message(rec['chat_id'], summary_text),
+        telegram_recipients,
+        TELEGRAM_SEND_WORKERS,
+    )
+    messages_sent += sum(1 for ok in sent if ok)
 
-    # Send documents (PDFs) with price and % change in caption
-    for item in all_new:
+    def send_item(item):
+        """Caption, download, send and release one announcement PDF; returns its seen row."""
         friendly_name = code_to_name.get(str(item['scrip_code'])) or str(item['scrip_code'])
         price, prev_close, pct = price_info.get(str(item['scrip_code']), (None, None, None))
-        def fmt_price(val):
-            try:
-                return f"₹{float(val):.2f}"
-            except Exception:
-                return "N/A"
         pct_str = ""
         if pct is not None:
             arrow = "🔼" if pct > 0 else ("🔻" if pct < 0 else "➖")
             sign = "+" if pct > 0 else ("" if pct == 0 else "")
             pct_str = f" ({arrow} {sign}{pct:.2f}%)"
-        price_line = f"\nPrice: {fmt_price(price)}{pct_str}" if price is not None else ""
+        price_line = f"\nPrice: {_safe_fmt_inr(price)}{pct_str}" if price is not None else ""
         # Include category in caption for clarity
         category_label = item.get('category') or ''
         if category_label:
             category_label = f"\nCategory: {category_label}"
         # 3M-ago price for financials
         extra_3m = ""
-        if item.get('category') == 'financials' and sym:
-            p3 = get_close_3m_ago(sym)
+        item_sym = symbol_map.get(str(item['scrip_code']))
+        if item.get('category') == 'financials' and item_sym:
+            p3 = get_close_3m_ago(item_sym)
             if p3 is not None:
                 extra_3m = f"\n3M ago: ₹{p3:,.2f}"
         caption = (
@@ -1196,22 +1487,34 @@ def send_bse_announcements_consolidated(user_client, user_id: str, monitored_scr
             f"{category_label}"
             f"{extra_3m}"
         )
-        pdf_url = f"{PDF_BASE_URL}{item['pdf_name']}"
         try:
-            resp = requests.get(pdf_url, headers=BSE_HEADERS, timeout=30)
-            if resp.status_code == 200 and resp.content:
-                for rec in telegram_recipients:
-                    files = {"document": (item['pdf_name'], resp.content, "application/pdf")}
-                    data = {"chat_id": rec['chat_id'], "caption": caption, "parse_mode": "HTML"}
-                    requests.post(f"{TELEGRAM_API_URL}/sendDocument", data=data, files=files, timeout=45)
-                # Record as seen for this user
-                db_save_seen_announcement(user_client, user_id, item['news_id'], item['scrip_code'], item['headline'], item['pdf_name'], item['ann_dt'].isoformat(), caption, item.get('category'))
-            else:
-                # Could not fetch PDF, still mark as seen to avoid repeated attempts
-                db_save_seen_announcement(user_client, user_id, item['news_id'], item['scrip_code'], item['headline'], item['pdf_name'], item['ann_dt'].isoformat(), caption, item.get('category'))
+            # The PDF is only held while this item is in flight; the process-wide
+            # slot keeps concurrent cron users from stacking up buffers
+            with _PDF_SLOTS:
+                pdf_content = _download_announcement_pdf(item)
+                if pdf_content:
+                    # Upload the streamed buffer itself to each recipient in turn rather than
+                    # copying it; _tg_post rewinds it before every upload. Items still run
+                    # PDF_SEND_WORKERS at a time
+                    for rec in telegram_recipients:
+                        _tg_post(
+                            'sendDocument',
+                            data={"chat_id": rec['chat_id'], "caption": caption},
+                            files={"document": (item['pdf_name'], pdf_content, "application/pdf")},
+                            timeout=45,
+                        )
         except Exception:
             # On errors, we still mark as seen to limit retries (could adjust behavior)
-            db_save_seen_announcement(user_client, user_id, item['news_id'], item['scrip_code'], item['headline'], item['pdf_name'], item['ann_dt'].isoformat(), caption, item.get('category'))
+            pass
+        # Record as seen for this user, also when the PDF could not be fetched,
+        # to avoid repeated attempts
+        return _seen_announcement_row(user_id, item['news_id'], item['scrip_code'], item['headline'], item['pdf_name'], item['ann_dt'].isoformat(), caption, item.get('category'))
+
+    # Send documents (PDFs) with price and % change in caption, a few items at a
+    # time; seen rows are written in one insert afterwards
+    seen_rows = _fan_out(send_item, all_new, PDF_SEND_WORKERS)
+
+    db_save_seen_announcements(user_client, seen_rows)
 
     # Final log line for Render logs
     try:
@@ -1228,7 +1531,7 @@ def _get_price_change_and_volume(sym: str):
     """
     try:
         s_intraday = yahoo_chart_series_cached(sym, '1d', '1m')
-        price = float(s_intraday.dropna().iloc[-1]) if s_intraday is not None and not s_intraday.empty else None
+        price = float(s_intraday.iloc[-1]) if s_intraday is not None and not s_intraday.empty else None
         # Daily OHLCV for last few days
         s_daily = yahoo_chart_series_cached(sym, '10d', '1d')
         prev_close = None
@@ -1237,11 +1540,10 @@ def _get_price_change_and_volume(sym: str):
         price_change_pct = None
         volume_spike_pct = None
         if s_daily is not None and not s_daily.empty:
-            closes = s_daily.dropna()
+            closes = s_daily
             # We don't have volume in this series; fetch via direct chart API
-            import requests
             url = f"https://query1.finance.yahoo.com/v8/finance/chart/{sym}?range=10d&interval=1d"
-            r = requests.get(url, timeout=10)
+            r = get_yahoo_session().get(url, timeout=10)
             vols = None
             if r.status_code == 200:
                 data = r.json()
@@ -1269,104 +1571,100 @@ def _get_price_change_and_volume(sym: str):
     except Exception:
         return None, None, None, None, None, None
 
+# Moving averages come from daily bars, so they are reused for up to an hour.
+# One entry per Yahoo symbol: bounded by the ticker list.
+MA_CACHE_TTL = int(os.environ.get("MA_CACHE_TTL", "3600"))
+_MA_CACHE = {}  # symbol -> (expires_at, (ma_50, ma_200))
+_MA_CACHE_LOCK = threading.Lock()
+
+def _ma50_ma200(symbols) -> dict:
+    """Return {symbol: (ma_50, ma_200)} from 1y daily closes, 'N/A' where history is too short.
+    Only symbols missing from the cache fetch their history.
+    """
+    import time
+    now = time.time()
+    result = {}
+    with _MA_CACHE_LOCK:
+        for sym in symbols:
+            cached = _MA_CACHE.get(sym)
+            if cached is not None and now < cached[0]:
+                result[sym] = cached[1]
+    missing = [sym for sym in symbols if sym not in result]
+    history = yahoo_chart_series_batch(missing, '1y', '1d') if missing else {}
+    for sym in missing:
+        ma_50 = 'N/A'
+        ma_200 = 'N/A'
+        s_hist = history.get(sym)
+        # Fewer than 50 bars leaves both averages 'N/A'; skip the array work entirely
+        if s_hist is not None and len(s_hist) >= 50:
+            # yahoo_chart_series_cached already drops NaNs, so the values are used as-is
+            # (no copy for float64); trailing slices are views
+            closes = s_hist.to_numpy(dtype='float64', copy=False)
+            sum_50 = closes[-50:].sum()
+            ma_50 = sum_50 / 50
+            if closes.size >= 200:
+                # The last 50 bars are shared with MA200: reuse their sum so each bar is read once
+                ma_200 = (closes[-200:-50].sum() + sum_50) / 200
+        result[sym] = (ma_50, ma_200)
+        # Failed fetches are not cached so the next run retries them
+        if s_hist is not None:
+            with _MA_CACHE_LOCK:
+                _MA_CACHE[sym] = (now + MA_CACHE_TTL, result[sym])
+    return result
+
+@lru_cache(maxsize=4096)
+def _fmt_inr(value: float) -> str:
+    return f"₹{value:.2f}"
+
+def _safe_fmt_inr(val) -> str:
+    """Format a price as rupees, or 'N/A' if it isn't numeric. Shared by the message builders
+    so their per-item loops don't redefine a formatter on every iteration."""
+    try:
+        # Round to display precision first so equal prices share a cache entry
+        return _fmt_inr(round(float(val), 2))
+    except Exception:
+        return "N/A"
+
 def send_script_messages_to_telegram(user_client, user_id: str, monitored_scrips, telegram_recipients):
     """
     Sends a single consolidated Telegram message with current price and moving averages
     for all monitored scrips. Uses batch requests to Yahoo Finance to reduce rate limits.
     Returns the number of messages sent (one per recipient).
     """
-    import yfinance as yf
-    import pandas as pd
     from datetime import datetime
 
-    def safe_fmt(val):
-        try:
-            return f"₹{float(val):.2f}"
-        except Exception:
-            return "N/A"
-
-    # Helper to safely pull a series from a yfinance.download DataFrame
-    def get_series(df, symbol, field='Close'):
-        if df is None or df.empty:
-            return None
-        try:
-            if isinstance(df.columns, pd.MultiIndex):
-                # Try group_by='ticker' layout first
-                if (symbol, field) in df.columns:
-                    return df[(symbol, field)].dropna()
-                # Some versions may return the inverse
-                if (field, symbol) in df.columns:
-                    return df[(field, symbol)].dropna()
-                return None
-            else:
-                if field in df.columns:
-                    return df[field].dropna()
-                return None
-        except Exception:
-            return None
-
     try:
-        # Load the stock tickers CSV to get Yahoo Finance symbols
-        company_df = pd.read_csv('indian_stock_tickers.csv')
-
-        # Map BSE codes -> Yahoo symbols and keep order/context
+        # Map BSE codes -> Yahoo symbols (from the cached ticker map) and keep order/context
         symbol_map = {}
         ordered_symbols = []
         for scrip in monitored_scrips:
             bse_code = scrip['bse_code']
             company_name = scrip['company_name']
 
-            # Find symbol for BSE code
-            try:
-                bse_code_int = int(bse_code)
-                ticker_match = company_df[company_df['BSE Code'] == bse_code_int]
-            except (ValueError, TypeError):
-                ticker_match = company_df[company_df['BSE Code'].astype(str) == str(bse_code)]
-
-            if ticker_match.empty:
-                print(f"Warning: No Yahoo Finance symbol found for BSE code {bse_code}")
-                continue
-
-            symbol = str(ticker_match.iloc[0]['Yahoo Symbol']).strip()
+            symbol = bse_code_to_yahoo_symbol(bse_code)
             if not symbol:
-                print(f"Warning: Empty Yahoo Finance symbol for BSE code {bse_code}")
+                logger.warning("No Yahoo Finance symbol found for BSE code %s", bse_code)
                 continue
 
             if os.environ.get("YAHOO_VERBOSE", "0") == "1":
-                print(f"Using Yahoo symbol: {symbol} for {company_name} ({bse_code})")
+                logger.info("Using Yahoo symbol: %s for %s (%s)", symbol, company_name, bse_code)
             symbol_map[symbol] = {'bse_code': bse_code, 'company_name': company_name}
             ordered_symbols.append(symbol)
 
         if not ordered_symbols:
-            print("No valid Yahoo symbols found for monitored scrips.")
+            logger.warning("No valid Yahoo symbols found for monitored scrips.")
             return 0
 
-        # Prepare session
-        session = get_yahoo_session()
-
-        # Chunk symbols in groups of 10
-        def chunks(lst, size):
-            for i in range(0, len(lst), size):
-                yield lst[i:i+size]
-
-        # Batch current prices via Yahoo Chart API (prefer chart API to avoid Quote API 401)
-        prices = {}
-        for batch in chunks(ordered_symbols, 10):
-            for sym in batch:
-                s_intraday = yahoo_chart_series_cached(sym, '1d', '1m')
-                if s_intraday is not None and not s_intraday.empty:
-                    prices[sym] = s_intraday.iloc[-1]
-                else:
-                    s_daily = yahoo_chart_series_cached(sym, '5d', '1d')
-                    if s_daily is not None and not s_daily.empty:
-                        prices[sym] = s_daily.iloc[-1]
-
         # Build consolidated message
         lines = []
         lines.append("📊 Market Update")
         lines.append(f"🕐 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         lines.append("")
         failed_symbols = []
+        # Moving averages for every symbol up front (history fetched concurrently, cached)
+        moving_averages = _ma50_ma200(ordered_symbols)
+        # Prices likewise: each lookup is one or more Yahoo round trips
+        quotes = dict(zip(ordered_symbols, _fan_out(get_cmp_and_prev, ordered_symbols, YAHOO_FETCH_WORKERS)))
 
         for symbol in ordered_symbols:
             meta = symbol_map[symbol]
@@ -1374,7 +1672,7 @@ def send_script_messages_to_telegram(user_client, user_id: str, monitored_scrips
             company_name = meta['company_name']
 
             # Current price with robust logic
-            cmp_price, prev_close, _src = get_cmp_and_prev(symbol)
+            cmp_price, prev_close, _src = quotes[symbol]
             current_price = cmp_price if cmp_price is not None else 'N/A'
 
             # Calculate percentage change
@@ -1389,22 +1687,11 @@ def send_script_messages_to_telegram(user_client, user_id: str, monitored_scrips
                 except Exception:
                     pass
 
-            # Moving averages from daily history via chart API (cached)
-            ma_50 = 'N/A'
-            ma_200 = 'N/A'
-            s_hist = yahoo_chart_series_cached(symbol, '1y', '1d')
-            if s_hist is not None and not s_hist.empty:
-                closes = s_hist.dropna()
-                if len(closes) >= 50:
-                    ma_50 = closes.tail(50).mean()
-                if len(closes) >= 200:
-                    ma_200 = closes.tail(200).mean()
+            ma_50, ma_200 = moving_averages[symbol]
 
             if current_price == 'N/A' and ma_50 == 'N/A' and ma_200 == 'N/A':
-                failed_symbols.append(f"{company_name} ({symbol})")
+                failed_symbols.append((company_name, symbol))
 
-            # Append section for this symbol
-            lines.append(f"• {company_name} ({bse_code})")
             # Color indicator logic
             indicator = '🟢'
             try:
@@ -1415,31 +1702,33 @@ def send_script_messages_to_telegram(user_client, user_id: str, monitored_scrips
             except Exception:
                 pass
 
-            lines.append(f"  - Price: {safe_fmt(current_price)}{change_str} {indicator}")
-            lines.append(f"  - MA50: {safe_fmt(ma_50)} | MA200: {safe_fmt(ma_200)}")
-            if prev_close is not None:
-                lines.append(f"  - Previous Close: {safe_fmt(prev_close)}")
-            lines.append("")
+            # Append section for this symbol as one block (trailing newline leaves a blank line)
+            prev_close_line = f"  - Previous Close: {_safe_fmt_inr(prev_close)}\n" if prev_close is not None else ""
+            lines.append(
+                f"• {company_name} ({bse_code})\n"
+                f"  - Price: {_safe_fmt_inr(current_price)}{change_str} {indicator}\n"
+                f"  - MA50: {_safe_fmt_inr(ma_50)} | MA200: {_safe_fmt_inr(ma_200)}\n"
+                f"{prev_close_line}"
+            )
 
         if failed_symbols:
-            lines.append("⚠️ Could not fetch data for: " + ", ".join(failed_symbols))
+            lines.append("⚠️ Could not fetch data for: " + ", ".join(f"{name} ({sym})" for name, sym in failed_symbols))
 
         consolidated_message = "\n".join(lines).strip()
 
-        # Send one message per recipient
-        messages_sent = 0
-        for recipient in telegram_recipients:
-            chat_id = recipient['chat_id']
+        # Send one message per distinct chat, concurrently
+        def send_one(chat_id):
             try:
                 if send_telegram_message(chat_id, consolidated_message):
-                    messages_sent += 1
-                else:
-                    print(f"❌ Failed to send consolidated message to Telegram {chat_id}")
+                    return True
+                logger.error("Failed to send consolidated message to Telegram %s", chat_id)
             except Exception as e:
-                print(f"❌ Error sending consolidated message to Telegram {chat_id}: {e}")
+                logger.error("Error sending consolidated message to Telegram %s: %s", chat_id, e)
+            return False
 
-        return messages_sent
+        chat_ids = list(dict.fromkeys(str(r['chat_id']) for r in telegram_recipients))
+        return sum(_fan_out(send_one, chat_ids, TELEGRAM_SEND_WORKERS))
 
     except Exception as e:
-        print(f"Error in send_script_messages_to_telegram: {e}")
+        logger.error("Error in send_script_messages_to_telegram: %s", e)
         raise e
@@ -5,7 +5,31 @@ API Setup and Testing Script for Stock Sentiment Analysis
 
 import os
 import sys
-from config import TWITTER_BEARER_TOKEN, NEWS_API_KEY, INDIAN_NEWS_SOURCES
+from pathlib import Path
+
+_ENV_TEMPLATE = """# Stock Sentiment Analysis - Environment Variables
+# Copy this file to .env and fill in your actual API keys
+
+# Twitter API Configuration
+TWITTER_BEARER_TOKEN=your_twitter_bearer_token_here
+
+# News API Configuration  
+NEWS_API_KEY=your_news_api_key_here
+
+# Supabase Configuration (if needed)
+SUPABASE_URL=your_supabase_url_here
+SUPABASE_SERVICE_KEY=your_supabase_service_key_here
+
+# Telegram Bot Configuration
+TELEGRAM_BOT_TOKEN=
+"""
+
+def _prompt(message, env_var):
+    """Ask for a value on an interactive terminal; otherwise read it from the environment
+    so a non-interactive run never blocks on input()"""
+    if sys.stdin is not None and sys.stdin.isatty():
+        return input(message).strip()
+    return os.environ.get(env_var, '').strip()
 
 def setup_environment():
     """Setup environment variables for API keys"""
@@ -20,7 +44,7 @@ def setup_environment():
     print("4. Go to 'Keys and Tokens' tab")
     print("5. Copy your 'Bearer Token'")
     
-    twitter_token = input("\nEnter your Twitter Bearer Token (or press Enter to skip): ").strip()
+    twitter_token = _prompt("\nEnter your Twitter Bearer Token (or press Enter to skip): ", 'TWITTER_BEARER_TOKEN')
     if twitter_token:
         os.environ['TWITTER_BEARER_TOKEN'] = twitter_token
         print("✅ Twitter Bearer Token set")
@@ -33,7 +57,7 @@ def setup_environment():
     print("2. Sign up for a free account")
     print("3. Get your API key from the dashboard")
     
-    news_key = input("\nEnter your News API key (or press Enter to skip): ").strip()
+    news_key = _prompt("\nEnter your News API key (or press Enter to skip): ", 'NEWS_API_KEY')
     if news_key:
         os.environ['NEWS_API_KEY'] = news_key
         print("✅ News API key set")
@@ -86,26 +110,8 @@ def create_env_file():
     print("\n📝 CREATING ENVIRONMENT FILE:")
     print("=" * 60)
     
-    env_content = """# Stock Sentiment Analysis - Environment Variables
-# Copy this file to .env and fill in your actual API keys
-
-# Twitter API Configuration
-TWITTER_BEARER_TOKEN=your_twitter_bearer_token_here
-
-# News API Configuration  
-NEWS_API_KEY=your_news_api_key_here
-
-# Supabase Configuration (if needed)
-SUPABASE_URL=your_supabase_url_here
-SUPABASE_SERVICE_KEY=your_supabase_service_key_here
-
-# Telegram Bot Configuration
-TELEGRAM_BOT_TOKEN=
-"""
-    
     try:
-        with open('env_template.txt', 'w') as f:
-            f.write(env_content)
+        Path('env_template.txt').write_text(_ENV_TEMPLATE)
         print("✅ Created env_template.txt file")
         print("📋 Copy this to .env and fill in your actual API keys")
     except Exception as e:
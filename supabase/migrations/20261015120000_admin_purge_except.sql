@@ -0,0 +1,15 @@
+-- Used by /admin/purge: deletes every other user's rows in one call
+create or replace function public.admin_purge_except(keep uuid)
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  delete from seen_announcements where user_id <> keep;
+  delete from monitored_scrips where user_id <> keep;
+  delete from telegram_recipients where user_id <> keep;
+end;
+$$;
+revoke execute on function public.admin_purge_except(uuid) from public, anon, authenticated;
+grant execute on function public.admin_purge_except(uuid) to service_role;
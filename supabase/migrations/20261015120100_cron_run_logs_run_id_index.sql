@@ -0,0 +1,5 @@
+-- Serves the cron_run_summaries group-by/max(id) and the run_id lookups for
+-- the /admin/cron_runs detail rows. On a large live table, run it by hand as
+-- "create index concurrently" (not allowed inside a migration's transaction).
+create index if not exists idx_cron_run_logs_runid_id
+  on public.cron_run_logs (run_id, id desc);
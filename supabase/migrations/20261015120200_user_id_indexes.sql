@@ -0,0 +1,6 @@
+-- user_id is a foreign key and Postgres does not index those automatically;
+-- per-user reads and /admin/purge filter on it. On large live tables, run these
+-- by hand as "create index concurrently" (not allowed inside a migration's transaction).
+create index if not exists idx_seen_announcements_user_id on public.seen_announcements (user_id);
+create index if not exists idx_monitored_scrips_user_id on public.monitored_scrips (user_id);
+create index if not exists idx_telegram_recipients_user_id on public.telegram_recipients (user_id);
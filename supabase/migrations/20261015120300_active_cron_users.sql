@@ -0,0 +1,20 @@
+-- Used by the cron endpoints: every user with monitored scrips, their scrips
+-- and recipients, grouped in one call
+create or replace function public.active_cron_users()
+returns table (user_id uuid, scrips jsonb, recipients jsonb)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+  select s.user_id,
+         jsonb_agg(jsonb_build_object('bse_code', s.bse_code, 'company_name', s.company_name)) as scrips,
+         coalesce((select jsonb_agg(jsonb_build_object('chat_id', r.chat_id))
+                   from telegram_recipients r
+                   where r.user_id = s.user_id), '[]'::jsonb) as recipients
+  from monitored_scrips s
+  where s.user_id is not null
+  group by s.user_id;
+$$;
+revoke all on function public.active_cron_users() from public, anon, authenticated;
+grant execute on function public.active_cron_users() to service_role;
@@ -0,0 +1,3 @@
+-- The cron writes one aggregate row (user_id null, skipped_count = N) per run
+-- for users it skipped, instead of one row per skipped user
+alter table public.cron_run_logs add column if not exists skipped_count integer;
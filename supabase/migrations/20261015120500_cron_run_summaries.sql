@@ -0,0 +1,18 @@
+-- Per-run totals for /admin/cron_runs; needs the skipped_count column.
+-- Only the newest 5000 log rows are grouped (a primary-key range scan), so
+-- the page's cost doesn't grow with the table;
+-- that window holds the 10 runs shown unless a run logs more than ~500 rows.
+create or replace view public.cron_run_summaries as
+select
+  run_id,
+  max(id) as latest_id,
+  max(job) as job,
+  count(distinct user_id) + coalesce(sum(skipped_count), 0) as total_users,
+  count(*) filter (where processed) as processed_users,
+  coalesce(sum(coalesce(skipped_count, 1)) filter (where processed is not true), 0) as skipped_users,
+  sum(coalesce(notifications_sent, 0)) as total_notifications,
+  sum(coalesce(recipients, 0)) as total_recipients
+from public.cron_run_logs
+where run_id is not null
+  and id > (select max(id) - 5000 from public.cron_run_logs)
+group by run_id;
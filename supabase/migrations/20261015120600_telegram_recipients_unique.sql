@@ -0,0 +1,8 @@
+-- Lets recipient additions upsert in one request. A chat_id may belong to
+-- several users, so uniqueness is on the pair; existing duplicate pairs are
+-- removed first so the constraint can be added.
+delete from public.telegram_recipients a
+  using public.telegram_recipients b
+  where a.user_id = b.user_id and a.chat_id = b.chat_id and a.ctid > b.ctid;
+alter table public.telegram_recipients
+  add constraint telegram_recipients_user_id_chat_id_key unique (user_id, chat_id);